@@ -0,0 +1,230 @@
+"""Локальная заглушка Telegram Bot API для бенчмарков без сети.
+
+Отдает обновления через getUpdates или, после setWebhook, сама отправляет
+их POST-запросами на вебхук. Исходящие вызовы бота (sendMessage и т.п.)
+записываются, а ожидающие их бенчмарки получают уведомление по chat_id.
+Для исходящих вызовов можно задать задержку ответа и долю ответов 429.
+"""
+import asyncio
+import itertools
+import json
+import random
+import socket
+import time
+
+from aiohttp import ClientSession, web
+
+
+def free_port() -> int:
+    """Свободный локальный порт: адрес заглушки нужно знать до импорта bot"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+BOT_USER = {"id": 42, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+
+
+# Вызовы, на которые распространяются задержка и 429: все, что не прием обновлений
+_INBOUND = ("getme", "getupdates", "setwebhook", "deletewebhook")
+
+
+class FakeTelegram:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, flood_rate: float = 0.0, retry_after: int = 1, seed: int = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_rate = flood_rate  # доля исходящих вызовов, получающих 429
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self.floods = 0
+        # Чаты, заблокировавшие бота: исходящие вызовы в них получают 403
+        self.blocked: set[int] = set()
+        self.updates: asyncio.Queue = asyncio.Queue()
+        self._arrived = asyncio.Event()
+        # (время по часам эпохи, метод, параметры) успешных вызовов
+        self.calls: list[tuple[float, str, dict]] = []
+        self.webhook = None
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._waiters: dict[int, list[tuple[asyncio.Future, object]]] = {}
+        self._pusher = None
+        self._runner = None
+        self.url = None
+
+    # --- обновления ---------------------------------------------------
+
+    def push(self, update: dict) -> dict:
+        update.setdefault("update_id", next(self._update_ids))
+        self.updates.put_nowait(update)
+        self._arrived.set()
+        return update
+
+    def push_message(self, user_id: int, text: str) -> dict:
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return self.push({"message": message})
+
+    def push_callback(self, user_id: int, data: str, message_id: int = 1) -> dict:
+        return self.push({"callback_query": {
+            "id": str(next(self._update_ids)),
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": BOT_USER,
+                "text": "...",
+            },
+        }})
+
+    def wait_for(self, chat_id: int, predicate=None) -> asyncio.Future:
+        """Future, которая завершится при следующем сообщении бота в чат.
+
+        ``predicate(payload)`` отбирает только нужные сообщения; результат -
+        момент вызова по time.perf_counter.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(chat_id, []).append((future, predicate))
+        return future
+
+    # --- Bot API --------------------------------------------------------
+
+    def _message(self, payload: dict) -> dict:
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(payload["chat_id"]), "type": "private"},
+            "from": BOT_USER,
+            "text": payload.get("text", ""),
+        }
+
+    def _record(self, method: str, payload: dict):
+        self.calls.append((time.time(), method, payload))
+        chat_id = payload.get("chat_id")
+        if chat_id is None:
+            return
+        waiters = self._waiters.pop(int(chat_id), ())
+        pending = []
+        for future, predicate in waiters:
+            if future.done():
+                continue
+            if predicate is None or predicate(payload):
+                future.set_result(time.perf_counter())
+            else:
+                pending.append((future, predicate))
+        if pending:
+            self._waiters.setdefault(int(chat_id), []).extend(pending)
+
+    async def _get_updates(self, payload: dict) -> list:
+        deadline = time.monotonic() + float(payload.get("timeout", 0))
+        limit = int(payload.get("limit", 100))
+        # Долгий опрос: ждем обновлений, но не забираем их, если уже включен вебхук
+        while self.updates.empty() or self.webhook is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self.webhook is not None:
+                return []
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return []
+        updates = []
+        while len(updates) < limit and not self.updates.empty():
+            updates.append(self.updates.get_nowait())
+        return updates
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        payload = dict(await request.post())
+        if not payload and request.can_read_body:
+            payload = await request.json()
+        name = method.lower()
+
+        if name not in _INBOUND:
+            if self.latency or self.jitter:
+                await asyncio.sleep(self.latency + self._random.random() * self.jitter)
+            if self.flood_rate and self._random.random() < self.flood_rate:
+                self.floods += 1
+                return web.json_response({
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                }, status=429)
+            if payload.get("chat_id") is not None and int(payload["chat_id"]) in self.blocked:
+                return web.json_response({
+                    "ok": False,
+                    "error_code": 403,
+                    "description": "Forbidden: bot was blocked by the user",
+                }, status=403)
+
+        if name == "getme":
+            result = BOT_USER
+        elif name == "getupdates":
+            result = await self._get_updates(payload)
+        elif name == "setwebhook":
+            self.webhook = (payload["url"], payload.get("secret_token"), int(payload.get("max_connections", 40)))
+            if self._pusher is None:
+                self._pusher = asyncio.create_task(self._push_webhook())
+            result = True
+        elif name == "deletewebhook":
+            self.webhook = None
+            result = True
+        elif name in ("sendmessage", "senddocument", "editmessagetext"):
+            result = self._message(payload)
+        else:
+            result = True
+
+        self._record(method, payload)
+        return web.json_response({"ok": True, "result": result})
+
+    async def _push_webhook(self):
+        async with ClientSession() as session:
+            slots = None
+            while True:
+                update = await self.updates.get()
+                if self.webhook is None:
+                    self.updates.put_nowait(update)
+                    await asyncio.sleep(0.05)
+                    continue
+                url, secret, max_connections = self.webhook
+                if slots is None:
+                    slots = asyncio.Semaphore(max_connections)
+                await slots.acquire()
+                asyncio.create_task(self._post(session, slots, url, secret, update))
+
+    async def _post(self, session, slots, url, secret, update):
+        try:
+            headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+            async with session.post(url, data=json.dumps(update), headers=headers) as response:
+                await response.read()
+        finally:
+            slots.release()
+
+    # --- жизненный цикл ---------------------------------------------------
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self._pusher is not None:
+            self._pusher.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
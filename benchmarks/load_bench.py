@@ -0,0 +1,236 @@
+"""Нагрузочный тест бота против локальной заглушки Bot API, без сети.
+
+Синтетические пользователи приходят с заданной частотой и проходят сценарий:
+однократное /add, выбор срочности, повторяющееся /add, /check, удаление
+повторяющегося кнопкой из списка, ожидание срабатывания однократного и его
+остановка кнопкой из уведомления. Отчет: задержки обработчиков и ответов
+по операциям, задержка от срока напоминания до доставки, стоимость записи
+журнала и память. Запуск из корня репозитория:
+
+    python -m benchmarks.load_bench
+    python -m benchmarks.load_bench --users 2000 --rate 200 --latency 0.05 --flood-rate 0.01
+    python -m benchmarks.load_bench --max-p99 50 --max-lag 2   # код выхода 1 при регрессии
+"""
+import argparse
+import asyncio
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.fake_telegram import FakeTelegram, free_port
+from benchmarks.memory_bench import rss
+
+STEP_TIMEOUT = 30
+
+
+def percentile(values: list[float], share: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def summary(values: list[float], scale: float = 1000) -> str:
+    return (
+        f"n={len(values):<6} p50 {percentile(values, 0.5) * scale:8.2f}  "
+        f"p95 {percentile(values, 0.95) * scale:8.2f}  p99 {percentile(values, 0.99) * scale:8.2f}  "
+        f"max {max(values, default=0) * scale:8.2f}"
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=500, help="сколько синтетических пользователей")
+    parser.add_argument("--rate", type=float, default=50, help="новых пользователей в секунду")
+    parser.add_argument("--delay", type=int, default=5, help="через сколько секунд срабатывает однократное")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа Bot API, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, с")
+    parser.add_argument("--flood-rate", type=float, default=0.0, help="доля исходящих вызовов с ответом 429")
+    parser.add_argument("--telegram-limits", action="store_true", help="оставить лимиты отправки Telegram")
+    parser.add_argument("--verbose", action="store_true", help="не глушить логи бота")
+    parser.add_argument("--max-p99", type=float, help="порог p99 обработчиков, мс")
+    parser.add_argument("--max-lag", type=float, help="порог p99 задержки доставки напоминаний, с")
+    return parser.parse_args()
+
+
+class Harness:
+    def __init__(self, args, fake: FakeTelegram):
+        from bot import dp
+        from bot.handlers.reminds.storage import persistence, reminders
+
+        self.args = args
+        self.fake = fake
+        self.reminders = reminders
+        self.handler: dict[str, list[float]] = defaultdict(list)
+        self.reply: dict[str, list[float]] = defaultdict(list)
+        self.lags: list[float] = []
+        self.handler_errors = 0
+        self.timeouts = 0
+        self.flushes: list[float] = []
+        self.flushed_records = 0
+
+        dp.update.outer_middleware(self._time_handler)
+        journal = persistence.journal
+        append = journal.append
+
+        def timed_append(records):
+            started = time.perf_counter()
+            append(records)
+            self.flushes.append(time.perf_counter() - started)
+            self.flushed_records += len(records)
+
+        journal.append = timed_append
+
+    async def _time_handler(self, handler, update, data):
+        if update.message is not None:
+            label = update.message.text.split()[0]
+        elif update.callback_query is not None:
+            label = update.callback_query.data.split("_")[0] + "_"
+        else:
+            label = update.event_type
+        started = time.perf_counter()
+        try:
+            return await handler(update, data)
+        except Exception:
+            self.handler_errors += 1
+            raise
+        finally:
+            self.handler[label].append(time.perf_counter() - started)
+
+    async def step(self, label: str, user_id: int, push, predicate=None) -> float:
+        waiter = self.fake.wait_for(user_id, predicate)
+        started = time.perf_counter()
+        push()
+        try:
+            done = await asyncio.wait_for(waiter, STEP_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        self.reply[label].append(done - started)
+        return done
+
+    async def user(self, user_id: int):
+        from bot.handlers.reminds.model import format_id
+
+        fake = self.fake
+        # Ждем уведомление с самого начала: при медленных шагах оно может прийти раньше последнего из них
+        pinged = fake.wait_for(user_id, lambda payload: payload.get("text", "").startswith("🔔"))
+        try:
+            await self.step("/add", user_id, lambda: fake.push_message(
+                user_id, f"/add через {self.args.delay} секунд Нагрузка {user_id}"
+            ))
+            once = self.reminders.user_reminders(user_id)[-1]
+            urgency = "urgent" if user_id % 2 else "normal"
+            await self.step("urgency", user_id, lambda: fake.push_callback(user_id, f"{urgency}_{format_id(once.id)}"))
+
+            await self.step("/add", user_id, lambda: fake.push_message(user_id, "/add ежедневно 03:00 Повтор"))
+            recurring = self.reminders.user_reminders(user_id)[-1]
+            await self.step("/check", user_id, lambda: fake.push_message(user_id, "/check"))
+            await self.step("delete", user_id, lambda: fake.push_callback(user_id, f"delrem_{format_id(recurring.id)}_0"))
+
+            delivered = await asyncio.wait_for(pinged, self.args.delay + STEP_TIMEOUT)
+            self.lags.append(time.time() - (time.perf_counter() - delivered) - once.next_run)
+
+            await self.step("stop", user_id, lambda: fake.push_callback(user_id, f"stop_{format_id(once.id)}"))
+        except asyncio.TimeoutError:
+            pass
+
+    async def drive(self):
+        users = []
+        for number in range(self.args.users):
+            users.append(asyncio.create_task(self.user(50_000_000 + number)))
+            await asyncio.sleep(1 / self.args.rate)
+        await asyncio.gather(*users)
+
+
+def report(harness: Harness, elapsed: float, rss_before: int, journal_bytes: int, delivery, fake) -> bool:
+    print(f"Пользователей: {harness.args.users}, за {elapsed:.1f} с, таймаутов шагов {harness.timeouts}, "
+          f"ошибок обработчиков {harness.handler_errors}, ответов 429 {fake.floods}")
+    print("\nОбработчики, мс:")
+    for label, values in sorted(harness.handler.items()):
+        print(f"  {label:<10} {summary(values)}")
+    print("Ответ пользователю (от обновления до вызова Bot API), мс:")
+    for label, values in sorted(harness.reply.items()):
+        print(f"  {label:<10} {summary(values)}")
+    print(f"Срок -> доставка напоминания, мс:\n  {'':<10} {summary(harness.lags)}")
+
+    flushes = harness.flushes
+    print(
+        f"\nЖурнал: {len(flushes)} сбросов, {harness.flushed_records} записей, "
+        f"{sum(flushes) * 1000:.1f} мс в потоке записи ({summary(flushes)}), {journal_bytes / 1024:.1f} КБ на диске"
+    )
+    print(f"Отправка: {delivery.stats()}")
+    print(f"Кэш напоминаний: {harness.reminders.stats()}")
+    print(
+        f"Память: RSS {rss() / 2**20:.1f} МБ (+{(rss() - rss_before) / 2**20:.1f} МБ за прогон), "
+        f"пик {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} МБ"
+    )
+
+    failed = False
+    all_handlers = [value for values in harness.handler.values() for value in values]
+    if harness.args.max_p99 is not None and percentile(all_handlers, 0.99) * 1000 > harness.args.max_p99:
+        print(f"РЕГРЕССИЯ: p99 обработчиков выше {harness.args.max_p99} мс")
+        failed = True
+    if harness.args.max_lag is not None and percentile(harness.lags, 0.99) > harness.args.max_lag:
+        print(f"РЕГРЕССИЯ: p99 задержки доставки выше {harness.args.max_lag} с")
+        failed = True
+    return not failed
+
+
+async def run(args) -> bool:
+    import bot.run  # noqa: F401 - регистрирует обработчики
+    from bot import bot, dp, delivery, scheduler
+    from bot.handlers.reminds.storage import persistence, nag
+
+    fake = FakeTelegram(latency=args.latency, jitter=args.jitter, flood_rate=args.flood_rate)
+    await fake.start(port=int(os.environ["FAKE_TELEGRAM_PORT"]))
+    harness = Harness(args, fake)
+    rss_before = rss()
+
+    delivery.start()
+    scheduler.start()
+    persistence.start()
+    nag.start()
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, close_bot_session=False))
+    started = time.perf_counter()
+    try:
+        await harness.drive()
+        elapsed = time.perf_counter() - started
+    finally:
+        await dp.stop_polling()
+        await polling
+        await nag.stop()
+        scheduler.shutdown(wait=False)
+        await persistence.stop()
+        await delivery.stop()
+        await bot.session.close()
+        await fake.stop()
+    journal_bytes = sum(os.path.getsize(path) for path in persistence.journal.files())
+    return report(harness, elapsed, rss_before, journal_bytes, delivery, fake)
+
+
+def main():
+    args = parse_args()
+    port = free_port()
+    os.environ["FAKE_TELEGRAM_PORT"] = str(port)
+    os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{port}"
+    os.environ.setdefault("BOT_TOKEN", "42:BENCHMARK")
+    os.environ.setdefault("REMINDERS_FILE", os.path.join(tempfile.mkdtemp(), "reminders.json"))
+    if not args.telegram_limits:
+        # Иначе результат определят лимиты Telegram, а не бот
+        os.environ.setdefault("DELIVERY_GLOBAL_RATE", "1000000")
+        os.environ.setdefault("DELIVERY_CHAT_RATE", "1000")
+    # При инъекции 429 ошибки обработчиков ожидаемы и считаются в отчете
+    from bot.logs.logging_config import logger
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING if args.verbose else logging.CRITICAL)
+    if not args.verbose:
+        logger.setLevel(logging.CRITICAL)
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
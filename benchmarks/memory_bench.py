@@ -0,0 +1,107 @@
+"""Память на хранение напоминаний: старые вложенные словари против ReminderStore.
+
+Каждый вариант строится в отдельном процессе, замеряется прирост RSS.
+Запуск из корня репозитория:
+
+    python -m benchmarks.memory_bench            # 1M напоминаний
+    python -m benchmarks.memory_bench 200000
+"""
+import gc
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+os.environ.setdefault("BOT_TOKEN", "42:BENCHMARK")
+
+LABELS = ("однократно", "ежедневно", "еженедельно", "ежемесячно")
+TEXTS = 1000  # различных текстов: пользователи часто пишут одно и то же
+
+
+def rss() -> int:
+    """Текущий RSS процесса в байтах"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def records(count: int, seed: int = 42):
+    """(user_id, reminder_id, запись в формате файла), строки каждый раз новые - как после json.load"""
+    rnd = random.Random(seed)
+    now = time.time()
+    for number in range(count):
+        user_id = 100000 + number // 5
+        frequency = rnd.choice(LABELS)
+        hour, minute = rnd.randrange(24), rnd.randrange(60)
+        once = frequency == LABELS[0]
+        yield str(user_id), f"{number:08x}", {
+            "text": "".join(("Напоминание ", str(rnd.randrange(TEXTS)))),
+            "time": "2 часа" if once else f"{hour:02d}:{minute:02d}",
+            "frequency": "".join(frequency),
+            "job_id": f"slot:{frequency}:{hour}:{minute}:None",
+            "chat_id": user_id,
+            "hour": None if once else hour,
+            "minute": None if once else minute,
+            "day": None,
+            "next_run": now + rnd.randrange(86400) if once else None,
+            "created_at": datetime.fromtimestamp(now).isoformat(),
+            "urgent": False,
+            "active": True,
+        }
+
+
+def build_dicts(count: int):
+    reminders = {}
+    for user_id, reminder_id, data in records(count):
+        reminders.setdefault(user_id, {})[reminder_id] = data
+    return reminders
+
+
+def build_store(count: int):
+    from bot.handlers.reminds.model import Reminder, ReminderStore, parse_id
+
+    store = ReminderStore()
+    for user_id, reminder_id, data in records(count):
+        store.add(Reminder.from_dict(int(user_id), parse_id(reminder_id), data))
+    return store
+
+
+def measure(variant: str, count: int):
+    # Импорт модели заранее, чтобы в замер попали только сами данные
+    import bot.handlers.reminds.model  # noqa: F401
+
+    gc.collect()
+    before = rss()
+    started = time.perf_counter()
+    data = build_dicts(count) if variant == "dicts" else build_store(count)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    print(rss() - before, elapsed)
+    del data
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--variant":
+        measure(sys.argv[2], int(sys.argv[3]))
+        return
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    results = {}
+    for variant in ("dicts", "store"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.memory_bench", "--variant", variant, str(count)],
+            check=True, capture_output=True, text=True,
+        ).stdout.split()
+        results[variant] = int(output[0]), float(output[1])
+        grown, elapsed = results[variant]
+        per_million = grown / count * 1_000_000 / 2**20
+        print(
+            f"{variant:>6}: {grown / 2**20:8.1f} МБ на {count} напоминаний, "
+            f"{per_million:7.1f} МБ на миллион, {grown / count:6.0f} байт на напоминание, построение {elapsed:.2f} с"
+        )
+    print(f"Экономия: {1 - results['store'][0] / results['dicts'][0]:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Регрессионный корпус, фаззинг и микробенчмарк разбора /add.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.parser_bench
+"""
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+os.environ.setdefault("BOT_TOKEN", "42:BENCHMARK")
+
+from bot.handlers.reminds.parser import NUMBER_WORDS, parse_reminder
+
+NOW = datetime(2026, 10, 18, 12, 0, tzinfo=ZoneInfo('Europe/Kaliningrad'))
+
+# (команда, ожидание): timedelta - задержка, (частота, час, минута) - повтор,
+# datetime - конкретный момент, ValueError - ошибка. Первые строки - примеры
+# из справки /add и приветствия /start
+CORPUS = [
+    ("/add ежедневно 14:35 Тест", ("ежедневно", 14, 35), "Тест"),
+    ("/add еженедельно в14.35 Тест", ("еженедельно", 14, 35), "Тест"),
+    ("/add через 2 часа Тест", timedelta(hours=2), "Тест"),
+    ("/add через 15 минут Тест", timedelta(minutes=15), "Тест"),
+    ("/add через шесть часов Тест", timedelta(hours=6), "Тест"),
+    ("/add через один час и пять минут Тест", timedelta(hours=1, minutes=5), "Тест"),
+    ("/add 31.12 23:59 Тест", datetime(2026, 12, 31, 23, 59, tzinfo=NOW.tzinfo), "Тест"),
+    ("/add через 1 минуту Вот так я могу предупреждать!😝", timedelta(minutes=1), "Вот так я могу предупреждать!😝"),
+
+    ("/add через двадцать пять минут Позвонить", timedelta(minutes=25), "Позвонить"),
+    ("/add через сорок две минуты Чай", timedelta(minutes=42), "Чай"),
+    ("/add через 1 час 30 минут Встреча", timedelta(hours=1, minutes=30), "Встреча"),
+    ("/add через 2ч. Обед", timedelta(hours=2), "Обед"),
+    ("/add через 30 секунд Проверка", timedelta(seconds=30), "Проверка"),
+    ("/add через 90 Проверка", timedelta(minutes=90), "Проверка"),
+    ("/add через час Погулять", timedelta(hours=1), "Погулять"),
+    ("/add через минуту Погулять", timedelta(minutes=1), "Погулять"),
+    ("/add через 2 часа и купить хлеб", timedelta(hours=2), "и купить хлеб"),
+    ("/add через 5 минут 10 отжиманий", timedelta(minutes=5), "10 отжиманий"),
+    ("/add через 3 часов Овсянка", timedelta(hours=3), "Овсянка"),
+    ("/add@NotifyBot через 10 мин Тест", timedelta(minutes=10), "Тест"),
+    ("/ADD ЧЕРЕЗ ДВА ЧАСА Тест", timedelta(hours=2), "Тест"),
+    ("/add ежемесячно 9:05 Счета", ("ежемесячно", 9, 5), "Счета"),
+    ("/add ежедневно в 07.00 Зарядка", ("ежедневно", 7, 0), "Зарядка"),
+    ("/add завтра в 9:00 Врач", datetime(2026, 10, 19, 9, 0, tzinfo=NOW.tzinfo), "Врач"),
+    ("/add 01.01.2027 00:00 С Новым годом", datetime(2027, 1, 1, 0, 0, tzinfo=NOW.tzinfo), "С Новым годом"),
+    ("/add 01.03 10:00 Весна", datetime(2027, 3, 1, 10, 0, tzinfo=NOW.tzinfo), "Весна"),
+    ("/add в 18:30 Ужин", datetime(2026, 10, 18, 18, 30, tzinfo=NOW.tzinfo), "Ужин"),
+    ("/add 11:00 Кофе", datetime(2026, 10, 19, 11, 0, tzinfo=NOW.tzinfo), "Кофе"),
+
+    ("/add", ValueError, None),
+    ("/add через Тест", ValueError, None),
+    ("/add через 2 часа", ValueError, None),
+    ("/add через 0 минут Тест", ValueError, None),
+    ("/add ежедневно 25:00 Тест", ValueError, None),
+    ("/add ежедневно Тест", ValueError, None),
+    ("/add 31.02 10:00 Тест", ValueError, None),
+    ("/add 01.01.2020 10:00 Тест", ValueError, None),
+    ("/add через 99999999999999 часов Тест", ValueError, None),
+    ("/add просто текст", ValueError, None),
+]
+
+
+def check_corpus() -> int:
+    failures = 0
+    for command, expected, text in CORPUS:
+        try:
+            parsed = parse_reminder(command, NOW)
+        except ValueError:
+            if expected is not ValueError:
+                failures += 1
+                print(f"FAIL {command!r}: неожиданная ошибка")
+            continue
+        if expected is ValueError:
+            got = parsed
+        elif isinstance(expected, timedelta):
+            got = parsed.delay
+        elif isinstance(expected, datetime):
+            got = parsed.run_at
+        else:
+            got = (parsed.frequency.label, parsed.hour, parsed.minute)
+        if got != expected or parsed.text != text:
+            failures += 1
+            print(f"FAIL {command!r}: {parsed}")
+    print(f"Корпус: {len(CORPUS) - failures}/{len(CORPUS)}")
+    return failures
+
+
+def fuzz(iterations: int = 20000, seed: int = 1) -> int:
+    """Случайные сочетания токенов грамматики: допустим только ValueError"""
+    rnd = random.Random(seed)
+    tokens = [
+        "/add", "через", "и", ",", "в", "ежедневно", "еженедельно", "ежемесячно", "завтра",
+        "час", "часа", "ч.", "минут", "мин", "секунд", "0", "7", "60", "999", "14:35", "25.12",
+        "31.02.2026", "9.5", "Тест", "😝", "", " ", *NUMBER_WORDS,
+    ]
+    failures = 0
+    for _ in range(iterations):
+        command = " ".join(rnd.choice(tokens) for _ in range(rnd.randrange(1, 8)))
+        if rnd.random() < 0.3:
+            command = "".join(rnd.sample(command, len(command)))
+        try:
+            parse_reminder(command, NOW)
+        except ValueError:
+            pass
+        except Exception as e:
+            failures += 1
+            print(f"FUZZ {command!r}: {type(e).__name__}: {e}")
+    print(f"Фаззинг: {iterations} входов, падений {failures}")
+    return failures
+
+
+def bench():
+    commands = [command for command, expected, _ in CORPUS if expected is not ValueError]
+    number = 20000
+    seconds = timeit.timeit(lambda: [parse_reminder(command, NOW) for command in commands], number=number)
+    per_call = seconds / (number * len(commands)) * 1e6
+    print(f"Разбор: {per_call:.2f} мкс на команду ({len(commands)} команд x {number})")
+
+
+def main():
+    failures = check_corpus() + fuzz()
+    bench()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
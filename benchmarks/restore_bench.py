@@ -0,0 +1,132 @@
+"""Бенчмарк восстановления расписания при старте.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.restore_bench            # 100k и 1M напоминаний
+    python -m benchmarks.restore_bench 50000
+
+Перед замерами проверяет, что дальнее однократное напоминание из кучи
+``deferred`` действительно доходит до заглушки Bot API.
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("BOT_TOKEN", "42:BENCHMARK")
+os.environ.setdefault("REMINDERS_FILE", os.path.join(tempfile.mkdtemp(), "reminders.json"))
+
+from benchmarks.fake_telegram import FakeTelegram, free_port
+
+PORT = free_port()
+os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{PORT}"
+
+from bot import delivery, scheduler, session
+from bot.handlers.reminds import restore
+from bot.handlers.reminds.storage import reminders, buckets, checkpoint
+from bot.handlers.reminds.model import Frequency, Reminder, dump_user
+
+RECURRING = (Frequency.DAILY, Frequency.WEEKLY, Frequency.MONTHLY)
+
+
+def generate(count: int, seed: int = 42):
+    """Заполняет хранилище синтетическими напоминаниями.
+
+    60% повторяющихся, из однократных 10% просрочены, 10% в пределах
+    горизонта восстановления и 80% - дальние.
+    """
+    rnd = random.Random(seed)
+    now = time.time()
+    reminders.clear()
+    for number in range(count):
+        user_id = 100000 + number // 5
+        reminder = Reminder(user_id, number, user_id, f"Напоминание {number % 1000}", created_at=int(now))
+        if rnd.random() < 0.6:
+            reminder.frequency = rnd.choice(RECURRING)
+            reminder.hour, reminder.minute = rnd.randrange(24), rnd.randrange(60)
+            reminder.day = {Frequency.DAILY: None, Frequency.WEEKLY: rnd.randrange(7), Frequency.MONTHLY: 1}[reminder.frequency]
+        else:
+            roll = rnd.random()
+            if roll < 0.1:
+                reminder.next_run = now - rnd.randrange(1, 86400)
+            elif roll < 0.2:
+                reminder.next_run = now + rnd.randrange(1, restore.RESTORE_HORIZON)
+            else:
+                reminder.next_run = now + rnd.randrange(restore.RESTORE_HORIZON, 30 * 86400)
+        reminders.add(reminder)
+
+
+def reset():
+    scheduler.remove_all_jobs()
+    for slot in buckets.slots():
+        for _, user_id, reminder_id in buckets.members(slot):
+            buckets.remove(user_id, reminder_id)
+    restore.deferred.clear()
+    restore.batches.clear()
+    # Недогнанное этим прогоном не должно попасть в следующий
+    checkpoint.begin_catch_up([])
+
+
+async def check_deferred():
+    """Отложенное напоминание переносится в планировщик фоновой задачей и отправляется"""
+    fake = FakeTelegram()
+    await fake.start(port=PORT)
+    horizon, restore.RESTORE_HORIZON = restore.RESTORE_HORIZON, 1
+    reminders.clear()
+    # Как после перезапуска: пользователь лежит на холодной странице, а не в памяти
+    reminder = Reminder(7, 1, 7, "Дальнее", next_run=time.time() + 3, created_at=int(time.time()))
+    reminders.load({"7": dump_user({reminder.id: reminder})})
+    try:
+        counts = restore.restore_reminders()
+        assert counts["deferred"] == 1, counts
+        delivery.start()
+        scheduler.start()
+        await asyncio.wait_for(fake.wait_for(7, lambda payload: "Дальнее" in payload.get("text", "")), timeout=10)
+        print("Отложенное напоминание доставлено")
+    finally:
+        restore.RESTORE_HORIZON = horizon
+        scheduler.shutdown(wait=False)
+        await asyncio.sleep(0)
+        await delivery.stop()
+        await fake.stop()
+        reset()
+
+
+async def run(count: int):
+    generate(count)
+    started = time.perf_counter()
+    counts = restore.restore_reminders()
+    restored = time.perf_counter() - started
+    if restore.catch_up_task is not None:
+        restore.catch_up_task.cancel()
+
+    started = time.perf_counter()
+    scheduler.start(paused=True)
+    scheduled = time.perf_counter() - started
+    job_count = len(scheduler.get_jobs())
+    scheduler.shutdown(wait=False)
+    # AsyncIOScheduler.shutdown выполняется в следующей итерации цикла
+    await asyncio.sleep(0)
+
+    print(
+        f"{count:>9} напоминаний: restore {restored:.2f} с, запуск планировщика {scheduled:.2f} с, "
+        f"задач {job_count}, слотов {len(buckets.slots())}, {counts}"
+    )
+    reset()
+
+
+async def bench(sizes: list[int]):
+    await check_deferred()
+    for size in sizes:
+        await run(size)
+    await session.close()
+
+
+def main():
+    asyncio.run(bench([int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Сравнение задержки и пропускной способности: long polling против вебхука.
+
+Оба режима работают против локальной заглушки Bot API (benchmarks/fake_telegram.py),
+сеть не нужна. Запуск из корня репозитория:
+
+    python -m benchmarks.webhook_bench            # 2000 обновлений
+    python -m benchmarks.webhook_bench 10000
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_telegram import FakeTelegram, free_port
+
+API_PORT = free_port()
+WEBHOOK_PORT = free_port()
+os.environ.setdefault("BOT_TOKEN", "42:BENCHMARK")
+os.environ.setdefault("REMINDERS_FILE", os.path.join(tempfile.mkdtemp(), "reminders.json"))
+os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{API_PORT}"
+os.environ["WEBHOOK_URL"] = f"http://127.0.0.1:{WEBHOOK_PORT}"
+os.environ["WEBHOOK_HOST"] = "127.0.0.1"
+os.environ["WEBHOOK_PORT"] = str(WEBHOOK_PORT)
+# Лимиты Telegram здесь не измеряются - иначе они и определят результат
+os.environ.setdefault("DELIVERY_GLOBAL_RATE", "1000000")
+os.environ.setdefault("DELIVERY_CHAT_RATE", "1000")
+
+import bot.run  # noqa: F401 - регистрирует обработчики
+from bot import bot as telegram_bot, dp, delivery
+from bot.webhook import run_webhook
+
+# Строка лога на каждое обновление заметно искажает замер
+logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+
+
+def percentile(values: list[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def drive(fake: FakeTelegram, count: int, first_user: int) -> dict:
+    """Отправляет count команд /check от разных пользователей и ждет ответов"""
+    waiters = []
+    started = time.perf_counter()
+    for number in range(count):
+        user_id = first_user + number
+        waiters.append((time.perf_counter(), fake.wait_for(user_id)))
+        fake.push_message(user_id, "/check")
+    latencies = [await future - pushed for pushed, future in waiters]
+    elapsed = time.perf_counter() - started
+    return {
+        "throughput": count / elapsed,
+        "p50": percentile(latencies, 0.5) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+    }
+
+
+async def bench_polling(fake: FakeTelegram, count: int) -> dict:
+    task = asyncio.create_task(dp.start_polling(telegram_bot, handle_signals=False, close_bot_session=False))
+    await drive(fake, 50, 10_000_000)
+    result = await drive(fake, count, 20_000_000)
+    await dp.stop_polling()
+    await task
+    return result
+
+
+async def bench_webhook(fake: FakeTelegram, count: int) -> dict:
+    stop = asyncio.Event()
+    task = asyncio.create_task(run_webhook(telegram_bot, dp, stop))
+    while fake.webhook is None:
+        await asyncio.sleep(0.01)
+    await drive(fake, 50, 30_000_000)
+    result = await drive(fake, count, 40_000_000)
+    stop.set()
+    await task
+    return result
+
+
+async def main(count: int):
+    fake = FakeTelegram()
+    await fake.start(port=API_PORT)
+    delivery.start()
+    try:
+        for name, bench in (("polling", bench_polling), ("webhook", bench_webhook)):
+            result = await bench(fake, count)
+            print(
+                f"{name:>8}: {result['throughput']:8.0f} обновлений/с, "
+                f"p50 {result['p50']:.1f} мс, p95 {result['p95']:.1f} мс, p99 {result['p99']:.1f} мс"
+            )
+    finally:
+        await delivery.stop()
+        await telegram_bot.session.close()
+        await fake.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
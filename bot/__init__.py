@@ -1,9 +1,59 @@
 import os
 
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-bot = Bot(token=os.getenv("BOT_TOKEN"))
+from bot.tenants import BotContext, Tenants
+from bot.utils.cleanup import MessageCleanup
+from bot.utils.delivery import DeliveryQueue, MultiDelivery
+from bot.utils.instrumentation import instrument
+from bot.utils.throttling import Throttling
+
+# BOT_TOKENS - несколько ботов через запятую в одном процессе, иначе один бот из BOT_TOKEN
+TOKENS = [token.strip() for token in os.getenv("BOT_TOKENS", "").split(",") if token.strip()] or [os.getenv("BOT_TOKEN")]
+# Все боты ходят в Bot API через одну сессию с пулом не больше HTTP_POOL_LIMIT соединений
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+
+# TELEGRAM_API_URL позволяет направить бота на локальный Bot API сервер или его заглушку
+api = TelegramAPIServer.from_base(os.getenv("TELEGRAM_API_URL")) if os.getenv("TELEGRAM_API_URL") else PRODUCTION
+session = AiohttpSession(api=api, limit=HTTP_POOL_LIMIT)
+bots = [Bot(token=token, session=session) for token in TOKENS]
+bot = bots[0]
+# Старые данные принадлежат боту из BOT_TOKEN, даже если он стоит в BOT_TOKENS не первым
+legacy = next((item for item in bots if item.token == os.getenv("BOT_TOKEN")), None)
+tenants = Tenants(bots, os.getenv("BOTS_FILE", "bots.json"), legacy.id if legacy is not None else None)
 dp = Dispatcher()
-scheduler = AsyncIOScheduler()
+dp.update.outer_middleware(BotContext())
+# Задача, пропустившая несколько срабатываний (например, пока цикл событий был занят), выполняется один раз.
+# Опоздавшая задача выполняется, если опоздала не больше чем на MISFIRE_GRACE_TIME секунд: одна задача
+# слота отвечает за все его напоминания, и пропуск по умолчанию после секунды задержки терял бы их все
+MISFIRE_GRACE_TIME = int(os.getenv("MISFIRE_GRACE_TIME", "60"))
+scheduler = AsyncIOScheduler(job_defaults={"coalesce": True, "misfire_grace_time": MISFIRE_GRACE_TIME})
+
+
+def _delivery_queue(queue_bot: Bot) -> DeliveryQueue:
+    return DeliveryQueue(
+        queue_bot,
+        global_rate=float(os.getenv("DELIVERY_GLOBAL_RATE", "30")),
+        chat_rate=float(os.getenv("DELIVERY_CHAT_RATE", "1")),
+    )
+
+
+# Лимиты Telegram у каждого бота свои, поэтому и очереди отправки
+delivery = _delivery_queue(bot) if len(bots) == 1 else MultiDelivery([_delivery_queue(item) for item in bots])
+# Сообщения не по делу и подсказки к ним удаляются пачкой раз в CLEANUP_WINDOW секунд
+cleanup = MessageCleanup(delivery, window=float(os.getenv("CLEANUP_WINDOW", "3")))
+# Ведра токенов на пользователя: THROTTLE_*_RATE в секунду, всплеск до THROTTLE_*_BURST
+throttling = Throttling(
+    delivery,
+    message_rate=float(os.getenv("THROTTLE_MESSAGE_RATE", "1")),
+    message_burst=float(os.getenv("THROTTLE_MESSAGE_BURST", "5")),
+    callback_rate=float(os.getenv("THROTTLE_CALLBACK_RATE", "2")),
+    callback_burst=float(os.getenv("THROTTLE_CALLBACK_BURST", "6")),
+)
+dp.message.outer_middleware(throttling)
+dp.callback_query.outer_middleware(throttling)
+instrument(bot, dp, scheduler, delivery, cleanup)
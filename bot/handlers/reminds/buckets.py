@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.triggers.cron import CronTrigger
+
+from bot.handlers.reminds.model import Frequency
+
+TIMEZONE = 'Europe/Kaliningrad'
+
+
+class Slot(NamedTuple):
+    """Минута срабатывания: частота, время и ограничение по дню"""
+    frequency: Frequency
+    hour: int
+    minute: int
+    day: Optional[int] = None  # день недели для еженедельных, число месяца для ежемесячных
+
+    @property
+    def job_id(self) -> str:
+        return f"slot:{self.frequency.name.lower()}:{self.hour}:{self.minute}:{self.day}"
+
+
+def make_slot(frequency: Frequency, hour: int, minute: int, now: datetime = None) -> Slot:
+    """Определяет слот для повторяющегося напоминания"""
+    if frequency is Frequency.DAILY:
+        return Slot(frequency, hour, minute)
+    elif frequency is Frequency.WEEKLY:
+        now = now or datetime.now(ZoneInfo(TIMEZONE))
+        return Slot(frequency, hour, minute, now.weekday())
+    elif frequency is Frequency.MONTHLY:
+        return Slot(frequency, hour, minute, 1)
+    else:
+        raise ValueError("Неизвестная частота")
+
+
+def fire_time(hour: int, minute: int, now: datetime = None) -> float:
+    """Последнее наступившее время hour:minute - срок срабатывания слота, который сейчас выполняется"""
+    now = now or datetime.now(ZoneInfo(TIMEZONE))
+    fire = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if fire > now:
+        fire -= timedelta(days=1)
+    return fire.timestamp()
+
+
+def slot_trigger(slot: Slot) -> CronTrigger:
+    """Создает триггер APScheduler для слота"""
+    if slot.frequency is Frequency.WEEKLY:
+        return CronTrigger(day_of_week=slot.day, hour=slot.hour, minute=slot.minute, timezone=TIMEZONE)
+    elif slot.frequency is Frequency.MONTHLY:
+        return CronTrigger(day=slot.day, hour=slot.hour, minute=slot.minute, timezone=TIMEZONE)
+    return CronTrigger(hour=slot.hour, minute=slot.minute, timezone=TIMEZONE)
+
+
+class SlotBuckets:
+    """Повторяющиеся напоминания, сгруппированные по минутам срабатывания.
+
+    На каждый занятый слот в планировщике одна cron-задача, которая вызывает
+    ``fire(*slot)`` и раздает уведомления всем участникам слота. Добавление
+    и удаление напоминания меняет только состав слота; задача создается для
+    первого участника и снимается вместе с последним.
+    """
+
+    def __init__(self, scheduler, fire):
+        self.scheduler = scheduler
+        self.fire = fire
+        self._members: dict[Slot, dict[tuple[int, int], int]] = {}
+        self._slots: dict[tuple[int, int], Slot] = {}
+
+    def _ensure_job(self, slot: Slot) -> dict[tuple[int, int], int]:
+        members = self._members.get(slot)
+        if members is None:
+            members = self._members[slot] = {}
+            self.scheduler.add_job(
+                self.fire,
+                trigger=slot_trigger(slot),
+                args=list(slot),
+                id=slot.job_id,
+                replace_existing=True,
+            )
+        return members
+
+    def add(self, slot: Slot, chat_id: int, user_id: int, reminder_id: int):
+        """Записывает напоминание в слот"""
+        key = (user_id, reminder_id)
+        if self._slots.get(key) not in (None, slot):
+            self.remove(user_id, reminder_id)
+        self._ensure_job(slot)[key] = chat_id
+        self._slots[key] = slot
+
+    def extend(self, slot: Slot, members: dict[tuple[int, int], int]):
+        """Массово записывает в слот напоминания, которых еще нет в других слотах"""
+        self._ensure_job(slot).update(members)
+        self._slots.update(dict.fromkeys(members, slot))
+
+    def remove(self, user_id: int, reminder_id: int) -> bool:
+        """Убирает напоминание из его слота"""
+        slot = self._slots.pop((user_id, reminder_id), None)
+        if slot is None:
+            return False
+        members = self._members[slot]
+        members.pop((user_id, reminder_id), None)
+        if not members:
+            del self._members[slot]
+            try:
+                self.scheduler.remove_job(slot.job_id)
+            except JobLookupError:
+                pass
+        return True
+
+    def members(self, slot: Slot) -> list[tuple[int, int, int]]:
+        """Снимок участников слота: (chat_id, user_id, reminder_id)"""
+        return [(chat_id, user_id, reminder_id) for (user_id, reminder_id), chat_id in self._members.get(slot, {}).items()]
+
+    def slots(self) -> list[Slot]:
+        return list(self._members)
@@ -0,0 +1,147 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from bot.logs.logging_config import logger
+
+# Меняется вместе с форматом ключей напоминаний в журнале: файл другой версии
+# не переносится, а пересоздается - восстановление тогда работает как без него
+SCHEMA_VERSION = 1
+
+
+class ScheduleCheckpoint:
+    """Состояние расписания, которого нет в журнале напоминаний.
+
+    Журнал хранит сами напоминания, по нему восстанавливаются слоты и
+    однократные задачи. Здесь, в SQLite-файле ``path``, лежит остальное:
+    когда процесс последний раз был жив (по нему при старте видно, какие
+    срабатывания пришлись на простой) и какие напоминания ждали нажатия
+    "Остановить" - их повторы продолжаются после перезапуска.
+
+    Пропущенное за простой, вычисленное при старте, тоже записывается
+    сюда целиком, а метка времени сразу сдвигается: дальше догоняющая
+    отправка вычеркивает отправленное по ходу, и после сбоя следующий
+    запуск продолжит с неотправленного.
+
+    Пишется фоновой задачей раз в ``interval`` секунд в потоке: метка
+    времени, разница повторов с прошлой записью и отправленное из
+    пропущенного одной транзакцией.
+    """
+
+    def __init__(self, path: str, interval: float = 5.0):
+        self.path = path
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._db = self._open()
+        self._saved: dict[tuple[int, int], int] = {}
+        self._task = None
+        self._progress = None
+
+    def _open(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+        row = db.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+        if row is not None and int(row[0]) != SCHEMA_VERSION:
+            logger.warning(f"Схема {self.path} версии {int(row[0])}, ожидалась {SCHEMA_VERSION}: состояние сброшено")
+            db.execute("DROP TABLE IF EXISTS nags")
+            db.execute("DROP TABLE IF EXISTS missed")
+            db.execute("DELETE FROM meta")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS nags ("
+            "user_id INTEGER NOT NULL, reminder_id INTEGER NOT NULL, chat_id INTEGER NOT NULL, "
+            "PRIMARY KEY (user_id, reminder_id)) WITHOUT ROWID"
+        )
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS missed ("
+            "user_id INTEGER NOT NULL, reminder_id INTEGER NOT NULL, chat_id INTEGER NOT NULL, due REAL NOT NULL, "
+            "PRIMARY KEY (user_id, reminder_id)) WITHOUT ROWID"
+        )
+        db.execute("INSERT OR REPLACE INTO meta VALUES ('schema', ?)", (SCHEMA_VERSION,))
+        return db
+
+    def last_seen(self) -> Optional[float]:
+        """Когда процесс последний раз записал состояние; None - записей еще не было"""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'heartbeat'").fetchone()
+        return None if row is None else row[0]
+
+    def nags(self) -> dict[tuple[int, int], int]:
+        """Повторы на момент последней записи: (user_id, reminder_id) -> chat_id"""
+        with self._lock:
+            rows = self._db.execute("SELECT user_id, reminder_id, chat_id FROM nags").fetchall()
+        self._saved = {(user_id, reminder_id): chat_id for user_id, reminder_id, chat_id in rows}
+        return dict(self._saved)
+
+    def missed(self) -> list[tuple[float, int, int, int]]:
+        """Пропущенное, что прошлый запуск не успел догнать: (due, user_id, reminder_id, chat_id)"""
+        with self._lock:
+            rows = self._db.execute("SELECT due, user_id, reminder_id, chat_id FROM missed").fetchall()
+        return rows
+
+    def begin_catch_up(self, missed: list[tuple[float, int, int, int]], now: float = None):
+        """Записывает все, что предстоит догнать, и сдвигает метку времени"""
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM missed")
+            self._db.executemany(
+                "INSERT OR REPLACE INTO missed VALUES (?, ?, ?, ?)",
+                ((user_id, reminder_id, chat_id, due) for due, user_id, reminder_id, chat_id in missed),
+            )
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('heartbeat', ?)", (time.time() if now is None else now,))
+            self._db.execute("COMMIT")
+
+    def save(self, nags: dict[tuple[int, int], int], sent: list[tuple[int, int]] = (), now: float = None):
+        """Записывает метку времени, разницу повторов с прошлой записью и догнанное ``sent``"""
+        removed = [key for key in self._saved if key not in nags]
+        added = [(*key, chat_id) for key, chat_id in nags.items() if self._saved.get(key) != chat_id]
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany("DELETE FROM nags WHERE user_id = ? AND reminder_id = ?", removed)
+            self._db.executemany("INSERT OR REPLACE INTO nags VALUES (?, ?, ?)", added)
+            self._db.executemany("DELETE FROM missed WHERE user_id = ? AND reminder_id = ?", sent)
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('heartbeat', ?)", (time.time() if now is None else now,))
+            self._db.execute("COMMIT")
+        self._saved = nags
+
+    def _state(self, snapshot) -> tuple:
+        # Не записанное из-за ошибки догнанное просто уйдет повторно после сбоя
+        return snapshot(), self._progress() if self._progress is not None else ()
+
+    async def _run(self, snapshot):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.save, *self._state(snapshot))
+            except Exception as e:
+                logger.error(f"Ошибка записи состояния расписания: {e}")
+
+    def start(self, snapshot, progress=None):
+        """``snapshot()`` возвращает текущие повторы в формате ``nags()``,
+        ``progress()`` - догнанное с прошлого вызова: [(user_id, reminder_id)]"""
+        self._progress = progress
+        self._task = asyncio.create_task(self._run(snapshot))
+
+    async def stop(self, snapshot):
+        """Останавливает запись и сохраняет состояние; без start ничего не пишет"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await asyncio.to_thread(self.save, *self._state(snapshot))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def files(path: str) -> list[str]:
+        return [path + suffix for suffix in ("", "-wal", "-shm") if os.path.exists(path + suffix)]
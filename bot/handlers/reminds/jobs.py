@@ -0,0 +1,57 @@
+from apscheduler.events import EVENT_JOB_REMOVED, EVENT_ALL_JOBS_REMOVED
+from apscheduler.jobstores.base import JobLookupError
+
+from bot.logs.logging_config import logger
+
+
+class JobIndex:
+    """Индекс (user_id, reminder_id) -> живые задачи планировщика.
+
+    Задачи, созданные через ``add_job``, попадают в индекс сразу, а удаляются
+    из него по событию планировщика - и при явном удалении, и когда
+    однократная задача отработала. Поэтому отмена напоминания не перебирает
+    все задачи планировщика, а снимает ровно свои.
+    """
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self._jobs: dict[tuple[int, int], set[str]] = {}
+        self._keys: dict[str, tuple[int, int]] = {}
+        scheduler.add_listener(self._on_removed, EVENT_JOB_REMOVED | EVENT_ALL_JOBS_REMOVED)
+
+    def add_job(self, user_id: int, reminder_id: int, func, *args, **kwargs):
+        """Добавляет задачу в планировщик и запоминает ее за напоминанием"""
+        job = self.scheduler.add_job(func, *args, **kwargs)
+        self.track(user_id, reminder_id, job.id)
+        return job
+
+    def track(self, user_id: int, reminder_id: int, job_id: str):
+        key = (user_id, reminder_id)
+        self._jobs.setdefault(key, set()).add(job_id)
+        self._keys[job_id] = key
+
+    def cancel(self, user_id: int, reminder_id: int):
+        """Снимает все задачи напоминания"""
+        for job_id in list(self._jobs.get((user_id, reminder_id), ())):
+            try:
+                self.scheduler.remove_job(job_id)
+            except JobLookupError:
+                self._forget(job_id)
+            except Exception as e:
+                logger.error(f"Ошибка при удалении задачи из scheduler: {e}")
+
+    def _forget(self, job_id: str):
+        key = self._keys.pop(job_id, None)
+        if key is None:
+            return
+        job_ids = self._jobs[key]
+        job_ids.discard(job_id)
+        if not job_ids:
+            del self._jobs[key]
+
+    def _on_removed(self, event):
+        if event.code == EVENT_ALL_JOBS_REMOVED:
+            self._jobs.clear()
+            self._keys.clear()
+        else:
+            self._forget(event.job_id)
@@ -0,0 +1,288 @@
+import os
+import json
+import glob
+import threading
+import time
+
+from bot.logs.logging_config import logger
+from bot.utils.metrics import histogram
+
+compaction_seconds = histogram("journal_compaction_seconds", "Длительность свертки журнала в снапшот")
+
+# Снапшот хранится по пользователю на строку, и свертка проходит его потоком,
+# отпуская GIL каждые SNAPSHOT_CHUNK пользователей: json.load и json.dump
+# всего файла держали бы цикл событий на все время разбора и записи
+SNAPSHOT_CHUNK = 500
+
+
+def _apply_add(reminders: dict, user_id: str, reminder_id: str, record: dict):
+    reminders.setdefault(user_id, {})[reminder_id] = record["data"]
+
+def _apply_import(reminders: dict, user_id: str, reminder_id: str, record: dict):
+    # Весь импорт пользователя - одна запись: после сбоя он есть целиком или его нет
+    reminders.setdefault(user_id, {}).update(record["data"])
+
+def _apply_set_urgent(reminders: dict, user_id: str, reminder_id: str, record: dict):
+    if reminder_id in reminders.get(user_id, {}):
+        reminders[user_id][reminder_id]["urgent"] = record["urgent"]
+
+def _apply_deactivate(reminders: dict, user_id: str, reminder_id: str, record: dict):
+    if reminder_id in reminders.get(user_id, {}):
+        reminders[user_id][reminder_id]["active"] = False
+
+def _apply_delete(reminders: dict, user_id: str, reminder_id: str, record: dict):
+    user_reminders = reminders.get(user_id)
+    if user_reminders is None:
+        return
+    user_reminders.pop(reminder_id, None)
+    if not user_reminders:
+        del reminders[user_id]
+
+
+# Все операции идемпотентны: повторное применение записи, уже попавшей
+# в снапшот (например, после падения во время компактификации), ничего не меняет
+OPERATIONS = {
+    "add": _apply_add,
+    "import": _apply_import,
+    "set_urgent": _apply_set_urgent,
+    "deactivate": _apply_deactivate,
+    "delete": _apply_delete,
+}
+
+
+def _one_user_per_line(f) -> bool:
+    """Снапшот записан по пользователю на строку; файл остается в начале"""
+    head = f.read(3)
+    f.seek(0)
+    # У старого снапшота с отступами после "{" идет перевод строки и пробелы
+    return head in ('{\n"', '{\n}')
+
+
+def apply_record(reminders: dict, record: dict):
+    """Применяет одну запись журнала к словарю напоминаний"""
+    OPERATIONS[record["op"]](reminders, record["user"], record["id"], record)
+
+
+class ReminderJournal:
+    """Хранилище напоминаний: снапшот + журнал изменений только на дозапись.
+
+    Снапшот лежит в ``path`` в прежнем формате reminders.json, но по
+    пользователю на строку; изменения дописываются в сегменты
+    ``path.journal.N`` по одной JSON-строке на запись. Компактификация
+    закрывает текущий сегмент и в фоновом потоке переписывает снапшот
+    потоком, применяя к нему закрытые сегменты, не трогая данные в памяти.
+    """
+
+    def __init__(self, path: str, compact_every: int = 10000):
+        self.path = path
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._compactor = None
+        self._segment = 0
+        self._file = None
+        self._records = 0
+        self._torn = False
+
+    def _segment_path(self, number: int) -> str:
+        return f"{self.path}.journal.{number}"
+
+    def _segments(self) -> list[int]:
+        numbers = []
+        for name in glob.glob(glob.escape(self.path) + ".journal.*"):
+            suffix = name.rsplit(".", 1)[1]
+            if suffix.isdigit():
+                numbers.append(int(suffix))
+        return sorted(numbers)
+
+    def _iter_snapshot(self):
+        """Пользователи снапшота по одному: (user_id, напоминания)"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            if not _one_user_per_line(f):
+                # Снапшот старого формата: одной строкой или с отступами
+                yield from json.load(f).items()
+                return
+            f.readline()
+            for number, line in enumerate(f, 1):
+                line = line.rstrip("\n")
+                if line == "}":
+                    return
+                yield from json.loads("{" + line.rstrip(",") + "}").items()
+                if number % SNAPSHOT_CHUNK == 0:
+                    time.sleep(0)
+        raise ValueError(f"Снапшот {self.path} оборван")
+
+    def _read_snapshot(self) -> dict:
+        return dict(self._iter_snapshot())
+
+    def _read_segment(self, number: int):
+        with open(self._segment_path(number), 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Оборванная запись в конце сегмента - след падения во время записи
+                    logger.warning(f"Пропущена поврежденная запись в журнале {number}")
+
+    def _replay(self, reminders: dict, number: int) -> int:
+        count = 0
+        for record in self._read_segment(number):
+            apply_record(reminders, record)
+            count += 1
+        return count
+
+    def _open_segment(self, number: int):
+        self._segment = number
+        self._file = open(self._segment_path(number), 'a', encoding='utf-8')
+        self._records = 0
+        self._torn = False
+
+    def read(self) -> dict:
+        """Читает снапшот и журнал, ничего не меняя на диске"""
+        reminders = self._read_snapshot()
+        for number in self._segments():
+            self._replay(reminders, number)
+        return reminders
+
+    def _legacy_snapshot(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return not _one_user_per_line(f)
+
+    def load(self) -> dict:
+        """Восстанавливает состояние из снапшота и журнала, открывает новый сегмент"""
+        reminders = self._read_snapshot()
+        if self._legacy_snapshot():
+            # Переписываем по пользователю на строку сразу, до запуска цикла
+            # событий: иначе первая свертка разбирала бы его целиком в фоне
+            self._write_snapshot(reminders.items())
+        segments = self._segments()
+        pending = 0
+        for number in segments:
+            pending += self._replay(reminders, number)
+        self._open_segment(segments[-1] + 1 if segments else 1)
+        self._records = pending
+        return reminders
+
+    def files(self) -> list[str]:
+        """Все файлы хранилища на диске: снапшот и сегменты журнала"""
+        paths = [self._segment_path(number) for number in self._segments()]
+        if os.path.exists(self.path):
+            paths.insert(0, self.path)
+        return paths
+
+    def append(self, records: list[dict]):
+        """Дописывает записи в текущий сегмент журнала"""
+        if not records:
+            return
+        data = "".join(
+            json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+            for record in records
+        )
+        with self._lock:
+            if self._file is None:
+                self._open_segment(self._segment + 1)
+            try:
+                # После неудачной записи на диске может остаться оборванная строка:
+                # повтор начинается с новой, чтобы не склеиться с ней
+                self._file.write("\n" + data if self._torn else data)
+                self._file.flush()
+            except OSError:
+                self._torn = True
+                raise
+            self._torn = False
+            self._records += len(records)
+            if self._records >= self.compact_every:
+                self._roll()
+
+    def _roll(self):
+        # Вызывается под self._lock: закрываем сегмент и сворачиваем его в фоне
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        closed = self._segment
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+            self._file.close()
+        self._open_segment(closed + 1)
+        self._compactor = threading.Thread(
+            target=self._compact, args=(closed,), name="reminders-compactor", daemon=True
+        )
+        self._compactor.start()
+
+    def _compact(self, upto: int):
+        with self._compact_lock, compaction_seconds.time():
+            try:
+                segments = [n for n in self._segments() if n <= upto]
+                # В памяти только изменения закрытых сегментов, по пользователям
+                # в исходном порядке; снапшот переписывается потоком
+                changes: dict[str, list[dict]] = {}
+                for number in segments:
+                    for record in self._read_segment(number):
+                        changes.setdefault(record["user"], []).append(record)
+                self._write_snapshot(self._merge(changes))
+                for number in segments:
+                    os.remove(self._segment_path(number))
+            except Exception as e:
+                logger.error(f"Ошибка компактификации журнала напоминаний: {e}")
+
+    def _merge(self, changes: dict[str, list[dict]]):
+        """Пользователи снапшота с примененными изменениями, затем новые из журнала"""
+        for user_id, user_reminders in self._iter_snapshot():
+            records = changes.pop(user_id, None)
+            if records is None:
+                yield user_id, user_reminders
+                continue
+            yield from self._apply_user(user_id, user_reminders, records)
+        for user_id, records in changes.items():
+            yield from self._apply_user(user_id, {}, records)
+
+    @staticmethod
+    def _apply_user(user_id: str, user_reminders: dict, records: list[dict]):
+        reminders = {user_id: user_reminders}
+        for record in records:
+            apply_record(reminders, record)
+        if reminders.get(user_id):
+            yield user_id, reminders[user_id]
+
+    def _write_snapshot(self, users):
+        """Пишет снапшот из пар (user_id, напоминания)"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            # Тот же JSON-объект, что и раньше, но по пользователю на строку
+            f.write("{")
+            separator = "\n"
+            for number, (user_id, user_reminders) in enumerate(users, 1):
+                f.write(
+                    separator + json.dumps(user_id, ensure_ascii=False) + ":"
+                    + json.dumps(user_reminders, ensure_ascii=False, separators=(',', ':'))
+                )
+                separator = ",\n"
+                if number % SNAPSHOT_CHUNK == 0:
+                    time.sleep(0)
+            f.write("\n}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def snapshot(self, reminders: dict):
+        """Записывает полный снапшот из памяти и очищает журнал"""
+        with self._lock, self._compact_lock:
+            if self._file is not None:
+                self._file.close()
+            self._write_snapshot(reminders.items())
+            for number in self._segments():
+                os.remove(self._segment_path(number))
+            self._open_segment(self._segment + 1)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
@@ -0,0 +1,252 @@
+import re
+import sys
+from datetime import datetime, timedelta
+from enum import IntEnum
+from typing import Iterator, Optional
+
+
+class Frequency(IntEnum):
+    ONCE = 0
+    DAILY = 1
+    WEEKLY = 2
+    MONTHLY = 3
+
+    @property
+    def label(self) -> str:
+        """Название частоты для пользователя и для файла хранилища"""
+        return _LABELS[self]
+
+    @property
+    def recurring(self) -> bool:
+        return self is not Frequency.ONCE
+
+    @classmethod
+    def from_label(cls, label: str) -> "Frequency":
+        try:
+            return _BY_LABEL[label.lower()]
+        except KeyError:
+            raise ValueError("Неизвестная частота") from None
+
+
+_LABELS = {
+    Frequency.ONCE: "однократно",
+    Frequency.DAILY: "ежедневно",
+    Frequency.WEEKLY: "еженедельно",
+    Frequency.MONTHLY: "ежемесячно",
+}
+_BY_LABEL = {label: frequency for frequency, label in _LABELS.items()}
+
+
+class Urgency(IntEnum):
+    NORMAL = 0
+    URGENT = 1
+
+
+def format_id(reminder_id: int) -> str:
+    """Id напоминания в callback_data и в файле хранилища: 8 hex-символов"""
+    return f"{reminder_id:08x}"
+
+
+def parse_id(text: str) -> int:
+    return int(text, 16)
+
+
+_LEGACY_HOURS = re.compile(r'(\d+)\s*час')
+_LEGACY_MINUTES = re.compile(r'(\d+)\s*минут')
+
+
+def _legacy_next_run(data: dict) -> float:
+    """Время срабатывания старой записи без next_run: created_at + "2 часа 5 минут" """
+    hours = _LEGACY_HOURS.search(data['time'])
+    minutes = _LEGACY_MINUTES.search(data['time'])
+    delay = timedelta(
+        hours=int(hours.group(1)) if hours else 0,
+        minutes=int(minutes.group(1)) if minutes else 0,
+    )
+    return (datetime.fromisoformat(data['created_at']) + delay).timestamp()
+
+
+def _epoch(value) -> int:
+    # Старые записи хранят created_at строкой ISO, новые - секундами эпохи
+    if isinstance(value, str):
+        return int(datetime.fromisoformat(value).timestamp())
+    return int(value or 0)
+
+
+class Reminder:
+    """Одно напоминание. Поля без __dict__: на миллионах записей это основная экономия памяти"""
+
+    __slots__ = (
+        "user_id", "id", "chat_id", "text", "frequency", "urgency", "active",
+        "hour", "minute", "day", "next_run", "created_at",
+    )
+
+    def __init__(
+        self,
+        user_id: int,
+        id: int,
+        chat_id: int,
+        text: str,
+        frequency: Frequency = Frequency.ONCE,
+        urgency: Urgency = Urgency.NORMAL,
+        active: bool = True,
+        hour: Optional[int] = None,
+        minute: Optional[int] = None,
+        day: Optional[int] = None,
+        next_run: Optional[float] = None,
+        created_at: int = 0,
+    ):
+        self.user_id = user_id
+        self.id = id
+        self.chat_id = chat_id
+        self.text = text
+        self.frequency = frequency
+        self.urgency = urgency
+        self.active = active
+        self.hour = hour
+        self.minute = minute
+        self.day = day
+        self.next_run = next_run  # секунды эпохи, только для однократных
+        self.created_at = created_at  # секунды эпохи
+
+    @property
+    def urgent(self) -> bool:
+        return self.urgency is Urgency.URGENT
+
+    def to_dict(self) -> dict:
+        """Запись в формате файла хранилища"""
+        return {
+            "text": self.text,
+            "frequency": self.frequency.label,
+            "chat_id": self.chat_id,
+            "hour": self.hour,
+            "minute": self.minute,
+            "day": self.day,
+            "next_run": self.next_run,
+            "created_at": self.created_at,
+            "urgent": self.urgent,
+            "active": self.active,
+        }
+
+    @classmethod
+    def from_dict(cls, user_id: int, reminder_id: int, data: dict) -> "Reminder":
+        """Собирает напоминание из записи хранилища, в том числе старого формата"""
+        frequency = Frequency.from_label(data['frequency'])
+        hour, minute, next_run = data.get('hour'), data.get('minute'), data.get('next_run')
+        if frequency.recurring and hour is None:
+            hour, minute = map(int, data['time'].replace('.', ':').split(':'))
+        elif not frequency.recurring and next_run is None:
+            next_run = _legacy_next_run(data)
+        return cls(
+            user_id,
+            reminder_id,
+            data.get('chat_id', user_id),
+            data['text'],
+            frequency,
+            Urgency.URGENT if data.get('urgent') else Urgency.NORMAL,
+            data.get('active', True),
+            hour,
+            minute,
+            data.get('day'),
+            next_run,
+            _epoch(data.get('created_at')),
+        )
+
+
+class ReminderStore:
+    """Все напоминания процесса: user_id -> {id напоминания -> Reminder}.
+
+    Ключи - числа, а не строки; одинаковые тексты хранятся в одном экземпляре,
+    chat_id личного чата разделяет объект с user_id. Доступ к напоминаниям
+    пользователя идет через ``_user``, чтобы наследники могли держать часть
+    пользователей вне памяти.
+    """
+
+    def __init__(self):
+        self._users: dict[int, dict[int, Reminder]] = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self) -> Iterator[Reminder]:
+        for _, user_reminders in self._all_users():
+            yield from user_reminders.values()
+
+    def _user(self, user_id: int, create: bool = False) -> Optional[dict[int, Reminder]]:
+        user_reminders = self._users.get(user_id)
+        if user_reminders is None and create:
+            user_reminders = self._users[user_id] = {}
+        return user_reminders
+
+    def _drop(self, user_id: int):
+        del self._users[user_id]
+
+    def _all_users(self) -> Iterator[tuple[int, dict[int, Reminder]]]:
+        yield from self._users.items()
+
+    def get(self, user_id: int, reminder_id: int) -> Optional[Reminder]:
+        user_reminders = self._user(user_id)
+        if user_reminders is None:
+            return None
+        return user_reminders.get(reminder_id)
+
+    def user_reminders(self, user_id: int) -> list[Reminder]:
+        """Напоминания пользователя в порядке создания"""
+        return list((self._user(user_id) or {}).values())
+
+    def count(self, user_id: int) -> int:
+        return len(self._user(user_id) or ())
+
+    @staticmethod
+    def _adopt(reminder: Reminder) -> Reminder:
+        reminder.text = sys.intern(reminder.text)
+        if reminder.chat_id == reminder.user_id:
+            reminder.chat_id = reminder.user_id
+        return reminder
+
+    def add(self, reminder: Reminder) -> Reminder:
+        self._adopt(reminder)
+        user_reminders = self._user(reminder.user_id, create=True)
+        if reminder.id not in user_reminders:
+            self._count += 1
+        user_reminders[reminder.id] = reminder
+        return reminder
+
+    def remove(self, user_id: int, reminder_id: int) -> Optional[Reminder]:
+        user_reminders = self._user(user_id)
+        if user_reminders is None:
+            return None
+        reminder = user_reminders.pop(reminder_id, None)
+        if reminder is not None:
+            self._count -= 1
+            if not user_reminders:
+                self._drop(user_id)
+        return reminder
+
+    def mark_dirty(self, user_id: int):
+        """Отмечает изменение напоминаний пользователя на месте (срочность, отключение)"""
+
+    def clear(self):
+        self._users.clear()
+        self._count = 0
+
+    def load(self, raw: dict) -> int:
+        """Переносит напоминания из словаря хранилища, возвращает число битых записей.
+
+        Словарь опустошается по ходу, чтобы не держать в памяти обе копии.
+        """
+        failed = 0
+        while raw:
+            user_key, user_reminders = raw.popitem()
+            user_id = int(user_key)
+            for reminder_key, data in user_reminders.items():
+                try:
+                    self.add(Reminder.from_dict(user_id, parse_id(reminder_key), data))
+                except (KeyError, TypeError, ValueError):
+                    failed += 1
+        return failed
+
+
+def dump_user(user_reminders: dict[int, Reminder]) -> dict:
+    return {format_id(reminder_id): reminder.to_dict() for reminder_id, reminder in user_reminders.items()}
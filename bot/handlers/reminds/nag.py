@@ -0,0 +1,143 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable
+
+from bot.logs.logging_config import logger
+from bot.handlers.reminds.model import format_id
+from bot.utils.delivery import TEMPORARY_ERRORS
+from bot.utils.metrics import histogram
+
+URGENT_INTERVAL = 10  # Каждые 10 секунд для срочных
+NORMAL_INTERVAL = 60  # Каждую минуту для обычных
+
+fire_lag = histogram("nag_fire_lag_seconds", "Опоздание повторного уведомления относительно срока")
+
+
+class _Nag:
+    __slots__ = ("chat_id", "urgent", "seq")
+
+    def __init__(self, chat_id: int, urgent: bool, seq: int):
+        self.chat_id = chat_id
+        self.urgent = urgent
+        self.seq = seq
+
+
+class NagEngine:
+    """Повторные уведомления для всех напоминаний в одной задаче asyncio.
+
+    Очередь - куча (время, номер, ключ) с ленивым удалением: добавление
+    стоит O(log n), отмена O(1) - запись просто пропадает из словаря, а ее
+    след в куче отбрасывается при извлечении. На каждом такте все созревшие
+    уведомления отправляются пачками по ``batch_size``; ``ping`` получает
+    срок уведомления по часам time.time в аргументе ``due``.
+    """
+
+    def __init__(self, ping: Callable[..., Awaitable[bool]], batch_size: int = 100):
+        self.ping = ping
+        self.batch_size = batch_size
+        self._heap: list[tuple[float, int, tuple[int, int]]] = []
+        self._nags: dict[tuple[int, int], _Nag] = {}
+        self._counter = itertools.count()
+        self._wakeup = None
+        self._task = None
+
+    def __len__(self):
+        return len(self._nags)
+
+    def snapshot(self) -> dict[tuple[int, int], int]:
+        """Текущие повторы: (user_id, reminder_id) -> chat_id"""
+        return {key: nag.chat_id for key, nag in self._nags.items()}
+
+    def _now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def _push(self, key: tuple[int, int], nag: _Nag, delay: float):
+        due = self._now() + delay
+        heapq.heappush(self._heap, (due, nag.seq, key))
+        if self._heap[0][1] == nag.seq and self._wakeup is not None:
+            self._wakeup.set()
+
+    def add(self, chat_id: int, user_id: int, reminder_id: int, urgent: bool, delay: float = None):
+        """Запускает (или перезапускает) повторы для напоминания"""
+        if delay is None:
+            delay = URGENT_INTERVAL if urgent else NORMAL_INTERVAL
+        key = (user_id, reminder_id)
+        nag = _Nag(chat_id, urgent, next(self._counter))
+        self._nags[key] = nag
+        self._push(key, nag, delay)
+
+    def cancel(self, user_id: int, reminder_id: int) -> bool:
+        """Останавливает повторы для напоминания"""
+        removed = self._nags.pop((user_id, reminder_id), None) is not None
+        # Если в куче скопилось слишком много отмененных записей - пересобираем ее
+        if removed and len(self._heap) > 64 and len(self._heap) > 2 * len(self._nags):
+            self._heap = [item for item in self._heap if self._is_live(item)]
+            heapq.heapify(self._heap)
+        return removed
+
+    def _is_live(self, item) -> bool:
+        nag = self._nags.get(item[2])
+        return nag is not None and nag.seq == item[1]
+
+    def _pop_due(self) -> list[tuple[tuple[int, int], _Nag, float]]:
+        now = self._now()
+        # Срок в куче - по часам цикла событий, очереди доставки он нужен по time.time
+        offset = time.time() - now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            item = heapq.heappop(self._heap)
+            if self._is_live(item):
+                fire_lag.observe(now - item[0])
+                due.append((item[2], self._nags[item[2]], item[0] + offset))
+        return due
+
+    async def _fire(self, batch: list[tuple[tuple[int, int], _Nag, float]]):
+        results = await asyncio.gather(
+            *(self.ping(nag.chat_id, key[0], key[1], nag.urgent, due=due) for key, nag, due in batch),
+            return_exceptions=True
+        )
+        for (key, nag, _), result in zip(batch, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    f"Ошибка повторного уведомления {format_id(key[1])}: {result}",
+                    extra={"user_id": key[0], "reminder_id": format_id(key[1])},
+                )
+            # Напоминание могли остановить или перезапустить, пока шла отправка
+            if self._nags.get(key) is not nag:
+                continue
+            # Повтор планируется после успеха или временной ошибки (429, сеть);
+            # после постоянной ошибки он снова упал бы так же
+            if result is False or (isinstance(result, Exception) and not isinstance(result, TEMPORARY_ERRORS)):
+                del self._nags[key]
+                continue
+            self._push(key, nag, URGENT_INTERVAL if nag.urgent else NORMAL_INTERVAL)
+
+    async def _run(self):
+        while True:
+            while self._heap and not self._is_live(self._heap[0]):
+                heapq.heappop(self._heap)
+            timeout = self._heap[0][0] - self._now() if self._heap else None
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+            due = self._pop_due()
+            for start in range(0, len(due), self.batch_size):
+                await self._fire(due[start:start + self.batch_size])
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,34 @@
+from collections import OrderedDict
+
+
+class PageCache:
+    """Кэш отрисованных страниц /check: user_id -> {номер страницы: (текст, клавиатура)}.
+
+    Страницы пользователя сбрасываются целиком при любом изменении его
+    напоминаний. Хранится не больше ``max_users`` пользователей, самые
+    давние вытесняются.
+    """
+
+    def __init__(self, max_users: int = 10000):
+        self.max_users = max_users
+        self._pages: OrderedDict[int, dict[int, tuple]] = OrderedDict()
+
+    def get(self, user_id: int, page: int):
+        pages = self._pages.get(user_id)
+        if pages is None:
+            return None
+        self._pages.move_to_end(user_id)
+        return pages.get(page)
+
+    def put(self, user_id: int, page: int, rendered: tuple):
+        pages = self._pages.get(user_id)
+        if pages is None:
+            pages = self._pages[user_id] = {}
+            if len(self._pages) > self.max_users:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(user_id)
+        pages[page] = rendered
+
+    def invalidate(self, user_id: int):
+        self._pages.pop(user_id, None)
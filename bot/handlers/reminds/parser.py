@@ -0,0 +1,163 @@
+import re
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional, Tuple
+
+from bot.handlers.reminds.model import Frequency
+
+NUMBER_WORDS = {
+    'один': 1, 'одна': 1, 'одну': 1, 'два': 2, 'две': 2, 'три': 3, 'четыре': 4, 'пять': 5,
+    'шесть': 6, 'семь': 7, 'восемь': 8, 'девять': 9, 'десять': 10,
+    'одиннадцать': 11, 'двенадцать': 12, 'тринадцать': 13, 'четырнадцать': 14,
+    'пятнадцать': 15, 'шестнадцать': 16, 'семнадцать': 17, 'восемнадцать': 18,
+    'девятнадцать': 19, 'двадцать': 20, 'тридцать': 30, 'сорок': 40,
+    'пятьдесят': 50, 'шестьдесят': 60
+}
+
+# Все выражения собираются один раз при импорте и применяются с позиции
+# (pattern.match(text, pos)), так что вход читается слева направо за один проход
+_SPACE = re.compile(r'\s*')
+_COMMAND = re.compile(r'/add(?:@\w+)?(?:\s+|$)', re.IGNORECASE)
+_RELATIVE = re.compile(r'через\b\s*', re.IGNORECASE)
+_NUMBER = re.compile(
+    r'(?P<digits>\d+)|(?P<word>' + '|'.join(sorted(NUMBER_WORDS, key=len, reverse=True)) + r')\b\s*',
+    re.IGNORECASE
+)
+_UNIT = re.compile(
+    r'(?:(?P<h>часов|часа|час|ч)|(?P<m>минуты|минуту|минут|мин)|(?P<s>секунды|секунду|секунд|сек))'
+    r'(?:\b|\.)\.?\s*',
+    re.IGNORECASE
+)
+_JOINER = re.compile(r'(?:и\b|,)\s*', re.IGNORECASE)
+_FREQUENCY = re.compile(
+    r'(?P<frequency>ежедневно|еженедельно|ежемесячно)\s*(?:в\s*)?(?P<hour>\d{1,2})[:.](?P<minute>\d{2})(?!\d)\s*',
+    re.IGNORECASE
+)
+_ABSOLUTE = re.compile(
+    r'(?:(?P<relday>сегодня|завтра|послезавтра)|(?P<day>\d{1,2})\.(?P<month>\d{1,2})(?:\.(?P<year>\d{4}|\d{2}))?)'
+    r'\s+(?:в\s*)?(?P<hour>\d{1,2})[:.](?P<minute>\d{2})(?!\d)\s*',
+    re.IGNORECASE
+)
+_CLOCK = re.compile(r'(?:в\s*)?(?P<hour>\d{1,2})[:.](?P<minute>\d{2})(?!\d)\s*', re.IGNORECASE)
+
+MAX_DELAY = 366 * 24 * 3600
+
+_RELATIVE_DAYS = {'сегодня': 0, 'завтра': 1, 'послезавтра': 2}
+_UNIT_SECONDS = {'h': 3600, 'm': 60, 's': 1}
+
+
+class ParsedReminder(NamedTuple):
+    """Результат разбора /add: когда напоминать и что"""
+    text: str
+    frequency: Frequency = Frequency.ONCE
+    delay: Optional[timedelta] = None  # для "через ..."
+    run_at: Optional[datetime] = None  # для однократных на конкретную дату и время
+    hour: Optional[int] = None  # для повторяющихся
+    minute: Optional[int] = None
+
+
+def _number(text: str, pos: int) -> Tuple[Optional[int], int]:
+    """Число цифрами или словами, включая составные: "двадцать пять" """
+    match = _NUMBER.match(text, pos)
+    if not match:
+        return None, pos
+    if match.group('digits'):
+        return int(match.group('digits')), _SPACE.match(text, match.end()).end()
+    value = NUMBER_WORDS[match.group('word').lower()]
+    if value >= 20 and value % 10 == 0:
+        tail = _NUMBER.match(text, match.end())
+        if tail and tail.group('word') and NUMBER_WORDS[tail.group('word').lower()] < 10:
+            return value + NUMBER_WORDS[tail.group('word').lower()], tail.end()
+    return value, match.end()
+
+
+def _duration(text: str, pos: int) -> Tuple[Optional[int], int]:
+    """Длительность в секундах: "2 часа", "час и пять минут", "1 час 30 минут", "90" """
+    total = None
+    while True:
+        start = pos
+        if total is not None:
+            joiner = _JOINER.match(text, pos)
+            if joiner:
+                pos = joiner.end()
+        number, pos = _number(text, pos)
+        unit = _UNIT.match(text, pos)
+        if unit:
+            total = (total or 0) + (1 if number is None else number) * _UNIT_SECONDS[unit.lastgroup]
+            pos = unit.end()
+        elif number is not None and total is None:
+            # Без единицы измерения число считается минутами
+            return number * 60, pos
+        else:
+            # Союз или число без единицы после длительности - уже текст напоминания
+            return total, start
+
+
+def _clock(hour: str, minute: str) -> Tuple[int, int]:
+    hour, minute = int(hour), int(minute)
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError("Некорректное время. Используйте ЧЧ:ММ")
+    return hour, minute
+
+
+def _reminder_text(text: str, pos: int) -> str:
+    reminder_text = text[pos:].strip()
+    if not reminder_text:
+        raise ValueError("Не указан текст напоминания")
+    return reminder_text
+
+
+def parse_reminder(text: str, now: datetime) -> ParsedReminder:
+    """Разбирает команду /add за один проход"""
+    text = text.strip()
+    match = _COMMAND.match(text)
+    pos = match.end() if match else 0
+
+    match = _RELATIVE.match(text, pos)
+    if match:
+        seconds, pos = _duration(text, match.end())
+        if seconds is None:
+            raise ValueError("Некорректный формат времени. Пример: /add через 2 часа Текст")
+        reminder_text = _reminder_text(text, pos)
+        if seconds == 0:
+            raise ValueError("Укажите корректный интервал (например: 2 часа или 30 минут)")
+        if seconds > MAX_DELAY:
+            raise ValueError("Слишком большой интервал, максимум - год")
+        return ParsedReminder(reminder_text, delay=timedelta(seconds=seconds))
+
+    match = _FREQUENCY.match(text, pos)
+    if match:
+        hour, minute = _clock(match.group('hour'), match.group('minute'))
+        return ParsedReminder(
+            _reminder_text(text, match.end()),
+            frequency=Frequency.from_label(match.group('frequency')),
+            hour=hour,
+            minute=minute,
+        )
+
+    match = _ABSOLUTE.match(text, pos) or _CLOCK.match(text, pos)
+    if match:
+        hour, minute = _clock(match.group('hour'), match.group('minute'))
+        reminder_text = _reminder_text(text, match.end())
+        groups = match.groupdict()
+        if groups.get('day'):
+            year = groups['year']
+            year = now.year if year is None else int(year) + (2000 if len(year) == 2 else 0)
+            try:
+                run_at = now.replace(year=year, month=int(groups['month']), day=int(groups['day']),
+                                     hour=hour, minute=minute, second=0, microsecond=0)
+                # Дата без года, которая в этом году уже прошла, - это следующий год
+                if groups['year'] is None and run_at <= now:
+                    run_at = run_at.replace(year=year + 1)
+            except ValueError:
+                raise ValueError("Некорректная дата. Используйте ДД.ММ или ДД.ММ.ГГГГ")
+        else:
+            run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if groups.get('relday'):
+                run_at += timedelta(days=_RELATIVE_DAYS[groups['relday'].lower()])
+            elif run_at <= now:
+                run_at += timedelta(days=1)
+        if run_at <= now:
+            raise ValueError("Это время уже прошло")
+        return ParsedReminder(reminder_text, run_at=run_at)
+
+    raise ValueError("Некорректный формат. Пример: /add ежедневно 14:35 Текст")
@@ -0,0 +1,86 @@
+import asyncio
+
+from bot.logs.logging_config import logger
+from bot.handlers.reminds.journal import ReminderJournal
+from bot.utils.metrics import counter, histogram
+
+flush_seconds = histogram("persistence_flush_seconds", "Длительность записи пачки изменений в журнал")
+flushed_records = counter("persistence_records_total", "Записи, сброшенные в журнал")
+
+
+class Persistence:
+    """Групповая запись изменений в журнал вне цикла событий.
+
+    Обработчики только добавляют запись в буфер и сразу отвечают пользователю.
+    Фоновая задача сбрасывает буфер в журнал через поток раз в ``interval``
+    секунд или раньше, если набралось ``batch_size`` записей.
+    """
+
+    def __init__(self, journal: ReminderJournal, interval: float = 1.0, batch_size: int = 500):
+        self.journal = journal
+        self.interval = interval
+        self.batch_size = batch_size
+        self._pending: list[dict] = []
+        self._wakeup = None
+        self._flush_lock = None
+        self._task = None
+
+    def record(self, op: str, user_id: str, reminder_id: str, **fields):
+        """Помечает изменение для записи, не блокируя обработчик"""
+        # Копируем вложенные словари: сериализация идет в другом потоке
+        fields = {key: dict(value) if isinstance(value, dict) else value for key, value in fields.items()}
+        self._pending.append({"op": op, "user": user_id, "id": reminder_id, **fields})
+        if len(self._pending) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def flush(self):
+        """Сбрасывает накопленные изменения в журнал"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            try:
+                with flush_seconds.time():
+                    await asyncio.to_thread(self.journal.append, batch)
+            except BaseException:
+                # Пачка возвращается в начало буфера и уйдет со следующим сбросом;
+                # повтор уже записанной части безопасен - операции журнала идемпотентны
+                self._pending[:0] = batch
+                raise
+            flushed_records.inc(len(batch))
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Ошибка записи журнала напоминаний: {e}")
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Останавливает фоновую запись и принудительно сбрасывает буфер"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        await self.flush()
+        await asyncio.to_thread(self.journal.close)
+
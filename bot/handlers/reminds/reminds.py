@@ -1,191 +1,112 @@
-import re
+import io
+import time
 from uuid import uuid4
-from datetime import datetime, timedelta
-from typing import Optional, Tuple
+from datetime import datetime
+from typing import Optional
+from zoneinfo import ZoneInfo
 
 from aiogram import types
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
+from aiogram.types import BufferedInputFile
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from apscheduler.triggers.cron import CronTrigger
 
-from bot import bot, dp, scheduler
+from bot import dp, delivery, tenants, throttling
 from bot.logs.logging_config import logger
-from bot.handlers.reminds.storage import reminders, save_reminders, send_scheduled_message, make_urgency_keyboard
+from bot.handlers.reminds.storage import (
+    reminders, log_change, log_import, jobs, buckets, pages, cancel_reminder, send_scheduled_message,
+    make_urgency_keyboard,
+)
+from bot.handlers.reminds.restore import schedule_bulk
+from bot.handlers.reminds.transfer import IMPORT_MAX_BYTES, build_reminder, export_csv, export_json, iter_entries
+from bot.handlers.reminds.buckets import make_slot, TIMEZONE
+from bot.handlers.reminds.parser import parse_reminder
+from bot.handlers.reminds.model import Frequency, Reminder, Urgency, format_id, parse_id
+from bot.utils.throttling import MAX_REMINDERS, MAX_URGENT, TOO_MANY_REMINDERS_TEXT, TOO_MANY_URGENT_TEXT
 
-NUMBER_WORDS = {
-    'один': 1, 'одна': 1, 'одну': 1, 'два': 2, 'две': 2, 'три': 3, 'четыре': 4, 'пять': 5,
-    'шесть': 6, 'семь': 7, 'восемь': 8, 'девять': 9, 'десять': 10,
-    'одиннадцать': 11, 'двенадцать': 12, 'тринадцать': 13, 'четырнадцать': 14,
-    'пятнадцать': 15, 'шестнадцать': 16, 'семнадцать': 17, 'восемнадцать': 18,
-    'девятнадцать': 19, 'двадцать': 20, 'тридцать': 30, 'сорок': 40,
-    'пятьдесят': 50, 'шестьдесят': 60
-}
+PAGE_SIZE = 5
+# Сколько ошибок импорта показывать пользователю
+IMPORT_ERRORS_SHOWN = 20
+IMPORT_HELP = (
+    "Пришлите файл с подписью /import или строки прямо после команды:\n\n"
+    "<code>/import\nежедневно 09:00 Зарядка\nчерез 2 часа Позвонить\n31.12 23:59 Праздник</code>\n\n"
+    "• .txt - по напоминанию на строку, как в /add\n"
+    "• .csv - колонки when, text и по желанию urgent, active, day\n"
+    "• .json - список строк или объектов с теми же полями\n\n"
+    "Файл в таком формате присылает /export (или /export json)"
+)
 
-def parse_relative_time(text: str) -> Optional[Tuple[int, int]]:
-    """Парсит относительное время из текста"""
-    text = text.lower().strip()
-    
-    # Обработка формата "через X минут/часов"
-    match = re.match(
-        r'(\d+|один|одна|одну|две|два|три|четыре|пять|шесть|семь|восемь|девять|десять|'
-        r'одиннадцать|двенадцать|тринадцать|четырнадцать|пятнадцать|шестнадцать|'
-        r'семнадцать|восемнадцать|девятнадцать|двадцать|тридцать|сорок|пятьдесят|шестьдесят)\s*'
-        r'(час|ч|часа|часов|минут|мин|минуту|минуты)?\s*'
-        r'(?:и\s*(\d+|один|одну|два|две|три|четыре|пять|шесть|семь|восемь|девять|десять)\s*'
-        r'(минут|мин|минуту|минуты))?\s*',
-        text
-    )
-    
-    if not match:
-        return None
-    
-    # Получаем числовое значение
-    num1 = match.group(1)
-    if num1.isdigit():
-        num1 = int(num1)
-    else:
-        num1 = NUMBER_WORDS.get(num1, 0)
-    
-    unit1 = match.group(2)
-    
-    # Обработка второго числа (если есть)
-    num2 = 0
-    if match.group(3):
-        num2_str = match.group(3)
-        if num2_str.isdigit():
-            num2 = int(num2_str)
-        else:
-            num2 = NUMBER_WORDS.get(num2_str, 0)
-    
-    # Определяем часы и минуты
-    hours, minutes = 0, 0
-    
-    if unit1:
-        if 'час' in unit1:
-            hours = num1
-            minutes = num2
-        elif 'мин' in unit1:
-            minutes = num1 + num2
-    else:
-        # Если единица измерения не указана, предполагаем минуты для небольших значений
-        if num1 <= 60:
-            minutes = num1
-        else:
-            hours = num1 // 60
-            minutes = num1 % 60
-    
-    return hours, minutes
-    
 @dp.message(Command("add"))
 async def cmd_add_reminder(message: types.Message):
     try:
-        user_id = str(message.from_user.id)
+        user_id = tenants.owner(message.bot, message.from_user.id)
         text = message.text.strip()
         
+        # Лимит проверяем до разбора и создания задач
+        if reminders.count(user_id) >= MAX_REMINDERS:
+            throttling.warn(message.chat.id, user_id, TOO_MANY_REMINDERS_TEXT)
+            return
+        
         # Генерируем уникальный ID для напоминания
-        reminder_id = uuid4().hex[:8]
+        reminder_id = parse_id(uuid4().hex[:8])
         
-        # 1. Обработка относительного времени (через X минут/часов)
-        if "через" in text.lower():
-            # Извлекаем текст после "/add через"
-            time_part = re.sub(r'^/add\s+через\s*', '', text, flags=re.IGNORECASE)
-            
-            # Парсим относительное время
-            time_data = parse_relative_time(time_part)
-            
-            if not time_data:
-                raise ValueError("Некорректный формат времени. Пример: /add через 2 часа Текст")
-            
-            hours, minutes = time_data
-            
-            # Извлекаем текст напоминания (все после временного выражения)
-            time_expr = re.compile(
-                r'^(\d+|[\w-]+)\s*(час|ч|часа|часов|минут|мин|минуту|минуты)?\s*'
-                r'(?:и\s*(\d+|[\w-]+)\s*(минут|мин|минуту|минуты))?\s*',
-                flags=re.IGNORECASE
-            )
-
-            match = time_expr.match(time_part)
-            if match:
-                # Берем текст после всего временного выражения
-                reminder_text = time_part[match.end():].strip()
-                # Удаляем возможные остаточные "ов" или "а" в начале
-                reminder_text = re.sub(r'^[ов а у ы]+\s*', '', reminder_text)
-            else:
-                reminder_text = time_part.strip()
-            
-            if not reminder_text:
-                raise ValueError("Не указан текст напоминания")
-            
-            # Проверяем валидность времени
-            if hours == 0 and minutes == 0:
-                raise ValueError("Укажите корректный интервал (например: 2 часа или 30 минут)")
-            
-            # Рассчитываем время выполнения
-            run_date = datetime.now() + timedelta(hours=hours, minutes=minutes)
-            time_str = format_relative_time(hours, minutes)
-            frequency = "однократно"
+        now = datetime.now(ZoneInfo(TIMEZONE))
+        parsed = parse_reminder(text, now)
+        reminder_text = parsed.text
+        frequency = parsed.frequency
+        
+        # 1. Однократное напоминание: через X минут/часов или на дату и время
+        if frequency is Frequency.ONCE:
+            run_date = now + parsed.delay if parsed.delay is not None else parsed.run_at
             
             # Создаем задачу
-            job = scheduler.add_job(
+            jobs.add_job(
+                user_id,
+                reminder_id,
                 send_scheduled_message,
                 'date',
                 run_date=run_date,
-                args=[message.chat.id, user_id, reminder_id],
-                timezone='Europe/Kaliningrad'
+                args=[message.chat.id, user_id, reminder_id, run_date.timestamp()],
+                timezone=TIMEZONE
             )
+            next_run = run_date.timestamp()
+            hour = minute = day = None
         
-        # 2. Обработка абсолютного времени (ежедневно/еженедельно/ежемесячно)
+        # 2. Повторяющееся напоминание (ежедневно/еженедельно/ежемесячно)
         else:
-            # Парсим команду с абсолютным временем
-            time_match = re.match(
-                r'/add\s+(ежедневно|еженедельно|ежемесячно)\s+в?\s*(\d{1,2}[:.]\d{2})\s+(.+)', 
-                text, 
-                re.IGNORECASE
-            )
-            
-            if not time_match or not time_match.group(3):
-                raise ValueError("Некорректный формат. Пример: /add ежедневно 14:35 Текст")
-            
-            frequency = time_match.group(1).lower()
-            time_str = time_match.group(2).replace('.', ':')
-            reminder_text = time_match.group(3).strip()
-            
-            # Парсим время
-            hour, minute = parse_time(time_str)
+            hour, minute = parsed.hour, parsed.minute
             
-            # Создаем триггер
-            trigger = create_trigger(frequency, hour, minute)
-            
-            # Добавляем задачу
-            job = scheduler.add_job(
-                send_scheduled_message,
-                trigger=trigger,
-                args=[message.chat.id, user_id, reminder_id],
-                timezone='Europe/Kaliningrad'
-            )
+            # Добавляем напоминание в слот - одна задача на всех, у кого то же время
+            slot = make_slot(frequency, hour, minute, now)
+            buckets.add(slot, message.chat.id, user_id, reminder_id)
+            next_run = None
+            day = slot.day
         
         # Сохраняем напоминание
-        if user_id not in reminders:
-            reminders[user_id] = {}
-            
-        reminders[user_id][reminder_id] = {
-                "text": reminder_text,
-                "time": time_str,
-                "frequency": frequency,
-                "job_id": job.id,
-                "created_at": datetime.now().isoformat(),
-                "urgent": False,
-                "active": True
-            }
-        save_reminders(reminders)
+        reminder = reminders.add(Reminder(
+            user_id,
+            reminder_id,
+            message.chat.id,
+            reminder_text,
+            frequency,
+            hour=hour,
+            minute=minute,
+            day=day,
+            next_run=next_run,
+            created_at=int(time.time()),
+        ))
+        log_change("add", user_id, reminder_id, data=reminder.to_dict())
         
-        await message.answer("Выберите срочность:", reply_markup=make_urgency_keyboard(reminder_id))
+        delivery.send_message(message.chat.id, "Выберите срочность:", reply_markup=make_urgency_keyboard(reminder_id))
         return
         
     except Exception as e:
-        logger.error(f"Ошибка при добавлении напоминания: {e}", exc_info=True)
-        await message.answer(
+        if isinstance(e, ValueError):
+            # Опечатка пользователя, а не сбой: без traceback и с ограничением частоты
+            logger.info(f"Не разобрано напоминание: {e}", extra={"event": "parse_error", "user_id": message.from_user.id})
+        else:
+            logger.error(f"Ошибка при добавлении напоминания: {e}", exc_info=True, extra={"user_id": message.from_user.id})
+        delivery.send_message(
+            message.chat.id,
             f"❌ Ошибка: {str(e)}\n\n"
             "Правильные форматы:\n"
             "• <code>/add ежедневно 14:35 Тест</code>\n"
@@ -193,164 +114,236 @@ async def cmd_add_reminder(message: types.Message):
             "• <code>/add через 2 часа Тест</code>\n"
             "• <code>/add через 15 минут Тест</code>\n"
             "• <code>/add через шесть часов Тест</code>\n"
-            "• <code>/add через один час и пять минут Тест</code>",
+            "• <code>/add через один час и пять минут Тест</code>\n"
+            "• <code>/add 31.12 23:59 Тест</code>",
             parse_mode="HTML"
         )
         
-def format_relative_time(hours: int, minutes: int) -> str:
-    """Форматирует относительное время для отображения"""
-    parts = []
-    if hours > 0:
-        parts.append(f"{hours} {pluralize(hours, 'час', 'часа', 'часов')}")
-    if minutes > 0:
-        parts.append(f"{minutes} {pluralize(minutes, 'минуту', 'минуты', 'минут')}")
-    return ' '.join(parts) if parts else "сейчас"
+def describe_time(reminder: Reminder) -> str:
+    """Время напоминания для списка: "14:35" для повторяющихся, дата для однократных"""
+    if reminder.frequency.recurring:
+        return f"{reminder.hour:02d}:{reminder.minute:02d}"
+    return datetime.fromtimestamp(reminder.next_run, ZoneInfo(TIMEZONE)).strftime("%d.%m.%Y %H:%M")
 
-def pluralize(number: int, form1: str, form2: str, form5: str) -> str:
-    """Склоняет слова после числительных"""
-    n = abs(number) % 100
-    if 5 <= n <= 20:
-        return form5
-    n %= 10
-    if n == 1:
-        return form1
-    if 2 <= n <= 4:
-        return form2
-    return form5
+def render_page(user_id: int, page: int) -> tuple[str, Optional[types.InlineKeyboardMarkup], int]:
+    """Отрисовывает страницу списка напоминаний, повторно использует кэш"""
+    items = reminders.user_reminders(user_id)
+    if not items:
+        return "У вас нет активных напоминаний", None, 0
+    
+    total = (len(items) + PAGE_SIZE - 1) // PAGE_SIZE
+    page = min(max(page, 0), total - 1)
+    cached = pages.get(user_id, page)
+    if cached is not None:
+        return cached
+    
+    lines = [f"Ваши напоминания ({page + 1}/{total}):"]
+    builder = InlineKeyboardBuilder()
+    first = page * PAGE_SIZE
+    for number, reminder in enumerate(items[first:first + PAGE_SIZE], first + 1):
+        lines.append(f"\n{number}. {reminder.text}\n• Время: {describe_time(reminder)}\n• Тип: {reminder.frequency.label}")
+        builder.button(text=f"❌ {number}", callback_data=f"delrem_{format_id(reminder.id)}_{page}")
+    builder.adjust(PAGE_SIZE)
+    
+    if total > 1:
+        navigation = [
+            types.InlineKeyboardButton(text="◀", callback_data=f"chkpg_{(page - 1) % total}"),
+            types.InlineKeyboardButton(text=f"{page + 1}/{total}", callback_data=f"chkpg_{page}"),
+            types.InlineKeyboardButton(text="▶", callback_data=f"chkpg_{(page + 1) % total}"),
+        ]
+        builder.row(*navigation)
+    
+    rendered = ("\n".join(lines), builder.as_markup(), page)
+    pages.put(user_id, page, rendered)
+    return rendered
 
-def parse_time(time_str: str) -> tuple[int, int]:
-    """Парсит время в формате ЧЧ:ММ или ЧЧ.ММ"""
-    try:
-        time_cleaned = time_str.replace('.', ':')
-        hour, minute = map(int, time_cleaned.split(':'))
-        if not (0 <= hour < 24 and 0 <= minute < 60):
-            raise ValueError
-        return hour, minute
-    except:
-        raise ValueError("Некорректное время. Используйте ЧЧ:ММ")
+def edit_message(callback: types.CallbackQuery, text: str, reply_markup=None):
+    """Редактирует сообщение с кнопкой через очередь отправки"""
+    return delivery.submit(
+        "edit_message_text",
+        callback.message.chat.id,
+        message_id=callback.message.message_id,
+        text=text,
+        reply_markup=reply_markup,
+    )
 
-def create_trigger(frequency: str, hour: int, minute: int):
-    """Создает триггер для APScheduler"""
-    freq = frequency.lower()
-    if freq.startswith("ежедневно"):
-        return CronTrigger(hour=hour, minute=minute)
-    elif freq.startswith("еженедельно"):
-        return CronTrigger(day_of_week='*', hour=hour, minute=minute)
-    elif freq.startswith("ежемесячно"):
-        return CronTrigger(day=1, hour=hour, minute=minute)
-    else:
-        raise ValueError("Неизвестная частота")
+def show_page(callback: types.CallbackQuery, page: int):
+    """Перерисовывает сообщение /check на месте"""
+    text, markup, _ = render_page(tenants.owner(callback.bot, callback.from_user.id), page)
+    edit_message(callback, text, reply_markup=markup)
 
 @dp.message(Command("check"))
 async def cmd_check_reminders(message: types.Message):
     try:
-        user_id = str(message.from_user.id)
-        
-        if user_id not in reminders or not reminders[user_id]:
-            await message.answer("У вас нет активных напоминаний")
-            return
-        
-        await message.answer("Ваши напоминания:")
-        
-        for reminder_id, data in reminders[user_id].items():
-            text = data.get("text", "Текст не указан")
-            time_info = data.get("time", "время не указано")
-            freq_info = data.get("frequency", "частота не указана")
-            
-            # Создаем сообщение с информацией о напоминании
-            await message.answer(
-                f"• Текст: {text}\n"
-                f"• Время: {time_info}\n"
-                f"• Тип: {freq_info}",
-                reply_markup=make_reminder_keyboard(reminder_id)
-            )
+        text, markup, _ = render_page(tenants.owner(message.bot, message.from_user.id), 0)
+        delivery.send_message(message.chat.id, text, reply_markup=markup)
             
     except Exception as e:
         logger.error(f"Ошибка при проверке напоминаний: {e}")
-        await message.answer("Произошла ошибка при получении списка напоминаний")
+        delivery.send_message(message.chat.id, "Произошла ошибка при получении списка напоминаний")
+
+@dp.callback_query(lambda c: c.data.startswith("chkpg_"))
+async def handle_check_page(callback: types.CallbackQuery):
+    try:
+        show_page(callback, int(callback.data.split("_")[1]))
+        await callback.answer()
+    except Exception as e:
+        logger.error(f"Ошибка при переключении страницы: {e}")
+        await callback.answer("Произошла ошибка при получении списка напоминаний")
 
 @dp.callback_query(lambda c: c.data.startswith("delrem_"))
 async def handle_delete_reminder(callback: types.CallbackQuery):
     try:
-        user_id = str(callback.from_user.id)
-        reminder_id = callback.data.split("_")[1]
+        user_id = tenants.owner(callback.bot, callback.from_user.id)
+        parts = callback.data.split("_")
+        reminder_id = parse_id(parts[1])
+        page = int(parts[2]) if len(parts) > 2 else 0
         
         # Проверяем существование напоминания
-        if user_id not in reminders or reminder_id not in reminders[user_id]:
+        if reminders.get(user_id, reminder_id) is None:
             await callback.answer("Напоминание не найдено")
+            show_page(callback, page)
             return
             
-        # Получаем данные о напоминании
-        reminder_data = reminders[user_id][reminder_id]
-        
-        # Удаляем задачу из планировщика
-        try:
-            scheduler.remove_job(reminder_data["job_id"])
-        except Exception as e:
-            logger.error(f"Ошибка при удалении задачи из scheduler: {e}")
+        # Удаляем все задачи и повторы напоминания
+        cancel_reminder(user_id, reminder_id)
         
         # Удаляем напоминание из хранилища
-        del reminders[user_id][reminder_id]
-        save_reminders(reminders)
+        reminders.remove(user_id, reminder_id)
+        log_change("delete", user_id, reminder_id)
         
-        # Редактируем исходное сообщение
-        await callback.message.edit_text(
-            "✅ Напоминание удалено",
-            reply_markup=None
-        )
-        await callback.answer()
+        # Перерисовываем текущую страницу списка
+        show_page(callback, page)
+        await callback.answer("✅ Напоминание удалено")
         
     except Exception as e:
         logger.error(f"Ошибка при удалении напоминания: {e}")
         await callback.answer("Произошла ошибка при удалении напоминания")
 
-def make_reminder_keyboard(reminder_id: str):
-    """Создает инлайн-клавиатуру для удаления напоминания"""
-    builder = InlineKeyboardBuilder()
-    builder.add(
-        types.InlineKeyboardButton(
-            text="❌ Удалить",
-            callback_data=f"delrem_{reminder_id}"
-        )
-    )
-    return builder.as_markup()
+def count_urgent(user_id: int) -> int:
+    return sum(reminder.urgent and reminder.active for reminder in reminders.user_reminders(user_id))
 
 @dp.callback_query(lambda c: c.data.startswith(("urgent_", "normal_")))
 async def set_urgency(callback: types.CallbackQuery):
     urgency, reminder_id = callback.data.split("_")
-    user_id = str(callback.from_user.id)
+    reminder = reminders.get(tenants.owner(callback.bot, callback.from_user.id), parse_id(reminder_id))
     
-    if user_id in reminders and reminder_id in reminders[user_id]:
+    if reminder is not None:
         is_urgent = (urgency == "urgent")
-        reminders[user_id][reminder_id]['urgent'] = is_urgent
-        save_reminders(reminders)
+        if is_urgent and not reminder.urgent and count_urgent(reminder.user_id) >= MAX_URGENT:
+            # Клавиатуру не убираем: можно выбрать обычное
+            await callback.answer(TOO_MANY_URGENT_TEXT, show_alert=True)
+            return
+        reminder.urgency = Urgency.URGENT if is_urgent else Urgency.NORMAL
+        log_change("set_urgent", reminder.user_id, reminder.id, urgent=is_urgent)
         
-        text = reminders[user_id][reminder_id]['text']
-        await callback.message.edit_text(
-            text=f"✅ Напоминание создано!\nТекст: {text}\nТип: {'СРОЧНОЕ' if is_urgent else 'Обычное'}",
-            reply_markup=None
+        edit_message(
+            callback, f"✅ Напоминание создано!\nТекст: {reminder.text}\nТип: {'СРОЧНОЕ' if is_urgent else 'Обычное'}"
         )
     await callback.answer()
 
 @dp.callback_query(lambda c: c.data.startswith("stop_"))
 async def stop_reminder(callback: types.CallbackQuery):
-    reminder_id = callback.data.split("_")[1]
-    user_id = str(callback.from_user.id)
+    reminder_id = parse_id(callback.data.split("_")[1])
+    user_id = tenants.owner(callback.bot, callback.from_user.id)
+    reminder = reminders.get(user_id, reminder_id)
     
-    if user_id in reminders and reminder_id in reminders[user_id]:
-        reminders[user_id][reminder_id]['active'] = False
-        save_reminders(reminders)
+    if reminder is not None:
+        reminder.active = False
         
         # Удаляем все запланированные уведомления для этого reminder_id
-        for job in scheduler.get_jobs():
-            if job.args and len(job.args) >= 3 and job.args[2] == reminder_id:
-                job.remove()
+        cancel_reminder(user_id, reminder_id)
         
-        await callback.message.edit_text(
-            text=f"⏸ Напоминание отключено: {reminders[user_id][reminder_id]['text']}",
-            reply_markup=None
-        )
-        if reminders[user_id][reminder_id]["frequency"] == "однократно":
-            del reminders[user_id][reminder_id]
-            save_reminders(reminders)
-    await callback.answer()
\ No newline at end of file
+        # Однократное напоминание сразу удаляем, остальные только отключаем
+        if reminder.frequency is Frequency.ONCE:
+            reminders.remove(user_id, reminder_id)
+            log_change("delete", user_id, reminder_id)
+        else:
+            log_change("deactivate", user_id, reminder_id)
+        
+        edit_message(callback, f"⏸ Напоминание отключено: {reminder.text}")
+    await callback.answer()
+
+@dp.message(Command("import"))
+async def cmd_import(message: types.Message):
+    user_id = tenants.owner(message.bot, message.from_user.id)
+    chat_id = message.chat.id
+    document = message.document
+    if document is not None:
+        if document.file_size and document.file_size > IMPORT_MAX_BYTES:
+            delivery.send_message(chat_id, f"❌ Файл больше {IMPORT_MAX_BYTES // 1024} КБ")
+            return
+        stream = await message.bot.download(document)
+        filename = document.file_name or ""
+    else:
+        # Строки можно прислать и в самом сообщении, после строки с командой
+        _, _, body = message.text.partition("\n")
+        if not body.strip():
+            delivery.send_message(chat_id, IMPORT_HELP, parse_mode="HTML")
+            return
+        stream = io.BytesIO(body.encode("utf-8"))
+        filename = ""
+    
+    now = datetime.now(ZoneInfo(TIMEZONE))
+    created_at = int(time.time())
+    room = MAX_REMINDERS - reminders.count(user_id)
+    urgent_room = MAX_URGENT - count_urgent(user_id)
+    added: list[Reminder] = []
+    errors: list[str] = []
+    downgraded = total = 0
+    
+    # Строки разбираются по одной; в хранилище, расписание и журнал
+    # все попадает одной пачкой в конце
+    try:
+        for entry in iter_entries(stream, filename):
+            total += 1
+            if len(added) >= room:
+                errors.append(f"строка {entry.number}: не больше {MAX_REMINDERS} напоминаний")
+                continue
+            try:
+                reminder = build_reminder(entry, user_id, chat_id, parse_id(uuid4().hex[:8]), now, created_at)
+            except ValueError as e:
+                errors.append(f"строка {entry.number}: {e}")
+                continue
+            if reminder.urgent and reminder.active:
+                if urgent_room > 0:
+                    urgent_room -= 1
+                else:
+                    reminder.urgency = Urgency.NORMAL
+                    downgraded += 1
+            added.append(reminder)
+    except ValueError as e:
+        errors.append(str(e))
+    
+    for reminder in added:
+        reminders.add(reminder)
+    if added:
+        schedule_bulk(added)
+        log_import(user_id, added)
+    logger.info(
+        f"Импорт пользователя {user_id}: добавлено {len(added)} из {total}, ошибок {len(errors)}",
+        extra={"user_id": user_id},
+    )
+    
+    lines = [f"✅ Импортировано напоминаний: {len(added)} из {total}"]
+    if downgraded:
+        lines.append(f"Срочность снята у {downgraded}: срочных может быть не больше {MAX_URGENT}")
+    if errors:
+        lines.append("\nОшибки:")
+        lines.extend(errors[:IMPORT_ERRORS_SHOWN])
+        if len(errors) > IMPORT_ERRORS_SHOWN:
+            lines.append(f"...и еще {len(errors) - IMPORT_ERRORS_SHOWN}")
+    delivery.send_message(chat_id, "\n".join(lines))
+
+@dp.message(Command("export"))
+async def cmd_export(message: types.Message, command: CommandObject):
+    items = reminders.user_reminders(tenants.owner(message.bot, message.from_user.id))
+    if not items:
+        delivery.send_message(message.chat.id, "У вас нет напоминаний")
+        return
+    
+    if (command.args or "").strip().lower() == "json":
+        document = BufferedInputFile(export_json(items), filename="reminders.json")
+    else:
+        document = BufferedInputFile(export_csv(items), filename="reminders.csv")
+    delivery.submit("send_document", message.chat.id, document=document)
@@ -0,0 +1,285 @@
+import asyncio
+import heapq
+import os
+import time
+from datetime import datetime
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from bot import scheduler
+from bot.logs.logging_config import logger
+from bot.handlers.reminds.storage import reminders, buckets, checkpoint, nag, log_change, send_scheduled_message
+from bot.handlers.reminds.buckets import Slot, TIMEZONE, make_slot, slot_trigger
+from bot.handlers.reminds.model import Frequency, Reminder, format_id
+from bot.handlers.reminds.nag import NORMAL_INTERVAL, URGENT_INTERVAL
+from bot.utils.ratelimit import TokenBucket
+
+# Однократные напоминания дальше этого горизонта не попадают в планировщик
+# при старте, а догружаются фоновой задачей по мере приближения
+RESTORE_HORIZON = int(os.getenv("RESTORE_HORIZON", "3600"))
+CATCH_UP_CHUNK = 100
+# Пропущенные за время простоя напоминания отправляются не быстрее этого,
+# чтобы после перезапуска оставался запас лимита Telegram на живые ответы
+CATCH_UP_RATE = float(os.getenv("CATCH_UP_RATE", "10"))
+
+# Отложенные однократные напоминания: (next_run, user_id, reminder_id)
+deferred: list[tuple[float, int, int]] = []
+# Пачки однократных напоминаний в пределах горизонта: секунда -> [(chat_id, user_id, reminder_id)]
+batches: dict[int, list[tuple[int, int, int]]] = {}
+# Догоняющая отправка после старта; None - догонять было нечего
+catch_up_task: Optional[asyncio.Task] = None
+# Догнанное с последней записи контрольной точки: (user_id, reminder_id)
+_caught_up: list[tuple[int, int]] = []
+
+
+def _slot_for(reminder: Reminder) -> Slot:
+    if reminder.day is None and reminder.frequency is not Frequency.DAILY:
+        # Старые еженедельные и ежемесячные напоминания хранились без дня: он
+        # выбирается здесь, а сохраняет его save_legacy_days. Еженедельные
+        # срабатывали в день создания, без created_at - в день перезапуска
+        created = datetime.fromtimestamp(reminder.created_at, ZoneInfo(TIMEZONE)) if reminder.created_at else None
+        reminder.day = make_slot(reminder.frequency, reminder.hour, reminder.minute, now=created).day
+    return Slot(reminder.frequency, reminder.hour, reminder.minute, reminder.day)
+
+
+def save_legacy_days(legacy: list[Reminder]):
+    """Записывает в хранилище и журнал дни, выбранные для старых напоминаний,
+    чтобы при следующем запуске день недели не сменился на день перезапуска"""
+    for reminder in legacy:
+        # Обход хранилища отдает копии холодных пользователей - меняем сам оригинал
+        stored = reminders.get(reminder.user_id, reminder.id)
+        if stored is None:
+            continue
+        stored.day = reminder.day
+        log_change("add", stored.user_id, stored.id, data=stored.to_dict())
+    if legacy:
+        logger.info(f"Старым напоминаниям назначен день: {len(legacy)}")
+
+
+def _schedule_one_shot(reminder: Reminder, next_run: float):
+    # Однократные напоминания собираются в пачки по секундам: одна задача
+    # планировщика на секунду вместо задачи на каждое напоминание
+    second = int(next_run)
+    batch = batches.get(second)
+    if batch is None:
+        batch = batches[second] = []
+        scheduler.add_job(
+            send_batch,
+            'date',
+            run_date=datetime.fromtimestamp(second, ZoneInfo(TIMEZONE)),
+            args=[second],
+            id=f"restore:{second}",
+            replace_existing=True,
+        )
+    batch.append((reminder.chat_id, reminder.user_id, reminder.id))
+
+
+async def send_batch(second: int):
+    """Отправляет пачку однократных напоминаний, назначенных на одну секунду"""
+    for number, (chat_id, user_id, reminder_id) in enumerate(batches.pop(second, ()), 1):
+        # Удаленные и остановленные напоминания send_scheduled_message пропустит сам
+        await send_scheduled_message(chat_id, user_id, reminder_id, second)
+        if number % CATCH_UP_CHUNK == 0:
+            await asyncio.sleep(0)
+
+
+def _ensure_promote_job():
+    if not scheduler.get_job("restore:deferred"):
+        scheduler.add_job(
+            promote_deferred,
+            'interval',
+            seconds=max(RESTORE_HORIZON // 2, 1),
+            id="restore:deferred",
+            replace_existing=True,
+        )
+
+
+def schedule_bulk(items: list[Reminder]):
+    """Ставит в расписание пачку новых напоминаний так же, как восстановление:
+    повторяющиеся - по слотам целиком, однократные - пачками по секундам
+    или в кучу ``deferred``, если они дальше горизонта.
+    """
+    limit = time.time() + RESTORE_HORIZON
+    slots: dict[Slot, dict[tuple[int, int], int]] = {}
+    for reminder in items:
+        if not reminder.active:
+            continue
+        if reminder.frequency.recurring:
+            slots.setdefault(_slot_for(reminder), {})[(reminder.user_id, reminder.id)] = reminder.chat_id
+        elif reminder.next_run <= limit:
+            _schedule_one_shot(reminder, reminder.next_run)
+        else:
+            heapq.heappush(deferred, (reminder.next_run, reminder.user_id, reminder.id))
+    for slot, members in slots.items():
+        buckets.extend(slot, members)
+    if deferred:
+        _ensure_promote_job()
+
+
+async def preload_users():
+    """Заранее поднимает в память пользователей, у которых скоро что-то сработает"""
+    reminders.preload()
+
+
+async def promote_deferred():
+    """Переносит в планировщик однократные напоминания, вошедшие в горизонт.
+
+    Корутина, а не функция: синхронные задачи APScheduler выполняет в пуле
+    потоков, а хранилище и планировщик можно трогать только из цикла событий.
+    """
+    limit = time.time() + RESTORE_HORIZON
+    while deferred and deferred[0][0] <= limit:
+        next_run, user_id, reminder_id = heapq.heappop(deferred)
+        reminder = reminders.get(user_id, reminder_id)
+        # Напоминание могли удалить, пока оно ждало своей очереди
+        if reminder is None or not reminder.active:
+            continue
+        _schedule_one_shot(reminder, next_run)
+    if not deferred and scheduler.get_job("restore:deferred"):
+        scheduler.remove_job("restore:deferred")
+
+
+def _fired_since(slot: Slot, since: float, now: float) -> Optional[float]:
+    """Время первого срабатывания слота в (since, now], если оно было"""
+    fire = slot_trigger(slot).get_next_fire_time(None, datetime.fromtimestamp(since, ZoneInfo(TIMEZONE)))
+    if fire is None or fire.timestamp() <= since or fire.timestamp() > now:
+        return None
+    return fire.timestamp()
+
+
+async def catch_up(missed: list[tuple[float, int, int, int]]):
+    """Отправляет пропущенные за время простоя напоминания, от давних к свежим, не быстрее CATCH_UP_RATE в секунду"""
+    missed.sort()
+    bucket = TokenBucket(CATCH_UP_RATE, CATCH_UP_RATE)
+    for due, user_id, reminder_id, chat_id in missed:
+        wait = bucket.delay()
+        if wait:
+            await asyncio.sleep(wait)
+        bucket.take()
+        await send_scheduled_message(chat_id, user_id, reminder_id, due)
+        _caught_up.append((user_id, reminder_id))
+    if missed:
+        logger.info(f"Отправлено пропущенных напоминаний: {len(missed)}")
+
+
+def catch_up_progress() -> list[tuple[int, int]]:
+    """Забирает догнанное с прошлого вызова - для контрольной точки"""
+    global _caught_up
+    sent, _caught_up = _caught_up, []
+    return sent
+
+
+async def stop_catch_up():
+    """Прерывает догоняющую отправку; неотправленное остается в контрольной точке"""
+    global catch_up_task
+    if catch_up_task is None:
+        return
+    catch_up_task.cancel()
+    try:
+        await catch_up_task
+    except asyncio.CancelledError:
+        pass
+    catch_up_task = None
+
+
+def restore_reminders() -> dict:
+    """Восстанавливает расписание за один проход по хранилищу.
+
+    Повторяющиеся напоминания раскладываются по слотам, однократные
+    в пределах горизонта ставятся в планировщик сразу, дальние уходят
+    в кучу ``deferred``, а просроченные - в фоновую догоняющую отправку.
+
+    По контрольной точке расписания восстанавливаются повторы, которые
+    ждали нажатия "Остановить", а повторяющиеся напоминания, чей слот
+    сработал за время простоя, тоже догоняются - один раз, сколько бы
+    срабатываний ни было пропущено. Недогнанное прошлым запуском
+    продолжается; все, что предстоит догнать, записывается в контрольную
+    точку до начала отправки.
+    """
+    global catch_up_task
+    now = time.time()
+    limit = now + RESTORE_HORIZON
+    last_seen = checkpoint.last_seen()
+    nagging = checkpoint.nags()
+    # (user_id, reminder_id) -> (due, user_id, reminder_id, chat_id); одно напоминание догоняется один раз
+    missed = {(item[1], item[2]): item for item in checkpoint.missed()}
+    legacy = []
+    resumed: dict[tuple[int, int], Reminder] = {}
+    slots: dict[Slot, dict[tuple[int, int], int]] = {}
+    counts = {"recurring": 0, "scheduled": 0, "deferred": 0, "missed": 0, "resumed": 0, "failed": 0}
+
+    for reminder in reminders:
+        try:
+            if not reminder.active:
+                continue
+            if reminder.frequency.recurring:
+                if reminder.day is None and reminder.frequency is not Frequency.DAILY:
+                    legacy.append(reminder)
+                slot = _slot_for(reminder)
+                members = slots.get(slot)
+                if members is None:
+                    members = slots[slot] = {}
+                members[(reminder.user_id, reminder.id)] = reminder.chat_id
+                counts["recurring"] += 1
+                if (reminder.user_id, reminder.id) in nagging:
+                    resumed[(reminder.user_id, reminder.id)] = reminder
+                continue
+            next_run = reminder.next_run
+            if next_run <= now and (reminder.user_id, reminder.id) in nagging and (
+                last_seen is None or next_run <= last_seen
+            ):
+                # Уже отправлено до остановки: продолжаем повторы, не отправляя заново
+                resumed[(reminder.user_id, reminder.id)] = reminder
+            elif next_run <= now:
+                missed.setdefault((reminder.user_id, reminder.id), (next_run, reminder.user_id, reminder.id, reminder.chat_id))
+            elif next_run <= limit:
+                _schedule_one_shot(reminder, next_run)
+                counts["scheduled"] += 1
+            else:
+                deferred.append((next_run, reminder.user_id, reminder.id))
+                counts["deferred"] += 1
+        except Exception as e:
+            counts["failed"] += 1
+            logger.error(
+                f"Ошибка восстановления напоминания {format_id(reminder.id)}: {e}",
+                extra={"user_id": reminder.user_id, "reminder_id": format_id(reminder.id)},
+            )
+
+    # Слоты заполняются целиком: одна задача планировщика на занятую минуту
+    for slot, members in slots.items():
+        buckets.extend(slot, members)
+        fired = _fired_since(slot, last_seen, now) if last_seen is not None else None
+        if fired is not None:
+            for (user_id, reminder_id), chat_id in members.items():
+                missed.setdefault((user_id, reminder_id), (fired, user_id, reminder_id, chat_id))
+
+    # Догоняющая отправка сама перезапустит повторы
+    for key in missed:
+        resumed.pop(key, None)
+    counts["missed"] = len(missed)
+
+    # Повторы растягиваются с той же скоростью, что и догоняющая отправка
+    for number, reminder in enumerate(resumed.values()):
+        interval = URGENT_INTERVAL if reminder.urgent else NORMAL_INTERVAL
+        nag.add(reminder.chat_id, reminder.user_id, reminder.id, reminder.urgent, delay=interval + number / CATCH_UP_RATE)
+    counts["resumed"] = len(resumed)
+    # После обхода: загрузка пользователей в память меняет страницы, по которым он идет
+    save_legacy_days(legacy)
+    reminders.preload(now)
+    scheduler.add_job(
+        preload_users,
+        'interval',
+        seconds=max(reminders.horizon // 2, 1),
+        id="reminders:preload",
+        replace_existing=True,
+    )
+    heapq.heapify(deferred)
+    if deferred:
+        _ensure_promote_job()
+    missed = list(missed.values())
+    checkpoint.begin_catch_up(missed, now)
+    if missed:
+        catch_up_task = asyncio.get_running_loop().create_task(catch_up(missed))
+
+    logger.info(f"Восстановлено напоминаний: {counts}")
+    return counts
@@ -1,75 +1,177 @@
 import os
-import json
-from datetime import datetime, timedelta
+import asyncio
 
 from aiogram import types
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from bot import bot, scheduler
+from bot import delivery, scheduler, tenants
 from bot.logs.logging_config import logger
+from bot.utils.delivery import Priority, chat_unreachable
+from bot.handlers.reminds.journal import ReminderJournal
+from bot.handlers.reminds.checkpoint import ScheduleCheckpoint
+from bot.handlers.reminds.persistence import Persistence
+from bot.handlers.reminds.nag import NagEngine
+from bot.handlers.reminds.jobs import JobIndex
+from bot.handlers.reminds.buckets import Slot, SlotBuckets, fire_time
+from bot.handlers.reminds.pages import PageCache
+from bot.handlers.reminds.model import Frequency, Reminder, dump_user, format_id
+from bot.handlers.reminds.tiered import TieredStore
+from bot.utils.metrics import counter, gauge
 
 
-def load_reminders():
-    if os.path.exists(REMINDERS_FILE):
-        with open(REMINDERS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+REMINDERS_FILE = os.getenv("REMINDERS_FILE", "reminders.json")
+journal = ReminderJournal(REMINDERS_FILE)
+persistence = Persistence(
+    journal,
+    interval=float(os.getenv("PERSIST_INTERVAL", "1.0")),
+    batch_size=int(os.getenv("PERSIST_BATCH_SIZE", "500")),
+)
+pages = PageCache()
+checkpoint = ScheduleCheckpoint(f"{REMINDERS_FILE}.schedule", interval=float(os.getenv("CHECKPOINT_INTERVAL", "5")))
+
+def load_reminders() -> TieredStore:
+    # Файл страниц - производная журнала, он пересобирается при каждом запуске
+    store = TieredStore(
+        f"{REMINDERS_FILE}.pages",
+        max_users=int(os.getenv("CACHE_MAX_USERS", "100000")),
+        max_pinned=int(os.getenv("CACHE_MAX_PINNED", "10000")),
+        horizon=int(os.getenv("CACHE_PIN_HORIZON", "3600")),
+    )
+    failed = store.load(journal.load())
+    if failed:
+        logger.error(f"Пропущено поврежденных напоминаний при загрузке: {failed}")
+    return store
+
+def log_change(op: str, user_id: int, reminder_id: int, **fields):
+    """Помечает изменение напоминания для фоновой записи в журнал"""
+    # В журнале ключи строковые, как в снапшоте
+    persistence.record(op, str(user_id), format_id(reminder_id), **fields)
+    reminders.mark_dirty(user_id)
+    pages.invalidate(user_id)
+
+def log_import(user_id: int, items: list[Reminder]):
+    """Пишет весь импорт пользователя одной записью журнала"""
+    persistence.record("import", str(user_id), "", data=dump_user({reminder.id: reminder for reminder in items}))
+    reminders.mark_dirty(user_id)
+    pages.invalidate(user_id)
+
 
-def save_reminders(reminders):
-    with open(REMINDERS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(reminders, f, ensure_ascii=False, indent=2)
-        
-        
-REMINDERS_FILE = "reminders.json"
 reminders = load_reminders()
 
-async def send_scheduled_message(chat_id: int, user_id: str, reminder_id: str):
+async def send_scheduled_message(chat_id: int, user_id: int, reminder_id: int, due: float = None):
+    """Первое уведомление напоминания; ``due`` - когда оно должно было сработать"""
     try:
-        if user_id in reminders and reminder_id in reminders[user_id]:
-            reminder = reminders[user_id][reminder_id]
+        reminder = reminders.get(user_id, reminder_id)
+        if reminder is not None:
+            urgent = reminder.urgent
             
-            # Первое уведомление
-            await send_repeated_alert(chat_id, user_id, reminder_id, reminder.get('urgent', False))
+            # Первое уведомление, дальше повторы ведет nag
+            if await send_repeated_alert(chat_id, user_id, reminder_id, urgent, due=due):
+                nag.add(chat_id, user_id, reminder_id, urgent)
             
     except Exception as e:
-        logger.error(f"Ошибка отправки напоминания: {e}")
+        logger.error(
+            f"Ошибка отправки напоминания: {e}",
+            extra={"user_id": user_id, "reminder_id": format_id(reminder_id)},
+        )
 
-async def send_repeated_alert(chat_id: int, user_id: str, reminder_id: str, urgent: bool):
-    if user_id not in reminders or reminder_id not in reminders[user_id]:
-        return
-        
-    reminder = reminders[user_id][reminder_id]
+async def send_repeated_alert(chat_id: int, user_id: int, reminder_id: int, urgent: bool, due: float = None) -> bool:
+    """Отправляет одно уведомление; False - повторять больше не нужно"""
+    reminder = reminders.get(user_id, reminder_id)
     
-    # Если напоминание отключено
-    if not reminder.get('active', True):
-        return
+    # Если напоминание удалено или отключено
+    if reminder is None or not reminder.active:
+        return False
+    
+    # Напоминание отправляет бот, у которого его создали
+    bot = tenants.bot_for(user_id)
+    if bot is None:
+        logger.warning(
+            f"Нет бота для напоминания {format_id(reminder_id)}",
+            extra={"event": "unknown_bot", "user_id": user_id, "reminder_id": format_id(reminder_id)},
+        )
+        return False
         
-    text = f"🔔 {reminder['text']}" + (" (СРОЧНО!)" if urgent else "")
+    text = f"🔔 {reminder.text}" + (" (СРОЧНО!)" if urgent else "")
     
     # Создаем клавиатуру с кнопкой отключения
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="⏸ Остановить", callback_data=f"stop_{reminder_id}")]
+        [InlineKeyboardButton(text="⏸ Остановить", callback_data=f"stop_{format_id(reminder_id)}")]
     ])
     
-    await bot.send_message(chat_id, text, reply_markup=keyboard)
-    
-    # Планируем следующее уведомление
-    if urgent:
-        interval = 10  # Каждые 10 секунд для срочных
-    else:
-        interval = 60  # Каждую минуту для обычных
-        
-    scheduler.add_job(
-        send_repeated_alert,
-        'date',
-        run_date=datetime.now() + timedelta(seconds=interval),
-        args=[chat_id, user_id, reminder_id, urgent],
-        timezone='Europe/Kaliningrad'
+    future = delivery.send_message(
+        chat_id, text, priority=Priority.URGENT if urgent else Priority.NORMAL, due=due, bot=bot, reply_markup=keyboard
     )
+    future.add_done_callback(lambda done: _alert_sent(user_id, reminder_id, done))
+    return True
 
-def make_urgency_keyboard(reminder_id: str):
+
+def _alert_sent(user_id: int, reminder_id: int, future: asyncio.Future):
+    # Результат отправки приходит уже после того, как повтор запланирован
+    if future.cancelled() or future.exception() is None:
+        return
+    if chat_unreachable(future.exception()):
+        disable_reminder(user_id, reminder_id)
+
+
+def disable_reminder(user_id: int, reminder_id: int):
+    """Отключает напоминание, которое некуда доставить: повторы и задачи снимаются"""
+    cancel_reminder(user_id, reminder_id)
+    reminder = reminders.get(user_id, reminder_id)
+    if reminder is None or not reminder.active:
+        return
+    reminder.active = False
+    log_change("deactivate", user_id, reminder_id)
+    logger.info(
+        f"Напоминание {format_id(reminder_id)} отключено: чат недоступен",
+        extra={"event": "chat_unreachable", "user_id": user_id, "reminder_id": format_id(reminder_id)},
+    )
+
+
+async def send_slot(frequency: Frequency, hour: int, minute: int, day: int = None):
+    """Раздает уведомления всем напоминаниям слота"""
+    due = fire_time(hour, minute)
+    for number, (chat_id, user_id, reminder_id) in enumerate(buckets.members(Slot(frequency, hour, minute, day)), 1):
+        await send_scheduled_message(chat_id, user_id, reminder_id, due)
+        # Большой слот не должен надолго занимать цикл событий
+        if number % 500 == 0:
+            await asyncio.sleep(0)
+
+
+nag = NagEngine(send_repeated_alert)
+jobs = JobIndex(scheduler)
+buckets = SlotBuckets(scheduler, send_slot)
+
+def _journal_bytes() -> int:
+    size = 0
+    for path in journal.files():
+        try:
+            size += os.path.getsize(path)
+        except FileNotFoundError:
+            # Сегмент успели удалить при компактификации
+            pass
+    return size
+
+gauge("nag_queue_depth", "Напоминания, ожидающие повторного уведомления", function=lambda: len(nag))
+gauge("reminders", "Напоминания в хранилище", function=lambda: len(reminders))
+gauge("reminders_hot_users", "Пользователи в памяти", function=lambda: reminders.stats()["hot_users"])
+gauge("persistence_pending", "Изменения, ждущие записи в журнал", function=lambda: persistence.pending)
+gauge("journal_bytes", "Размер снапшота и журнала на диске", function=_journal_bytes)
+counter(
+    "reminders_cache_total", "Обращения к кэшу напоминаний и вытеснения", ("result",),
+    function=lambda: {(key,): reminders.stats()[key] for key in ("hits", "misses", "evictions")},
+)
+
+def cancel_reminder(user_id: int, reminder_id: int):
+    """Снимает все задачи и повторы напоминания"""
+    jobs.cancel(user_id, reminder_id)
+    buckets.remove(user_id, reminder_id)
+    nag.cancel(user_id, reminder_id)
+
+def make_urgency_keyboard(reminder_id: int):
     """Создает инлайн-клавиатуру для срочности напоминания"""
+    reminder_id = format_id(reminder_id)
     builder = InlineKeyboardBuilder()
     builder.add(
         types.InlineKeyboardButton(
@@ -83,21 +185,3 @@ def make_urgency_keyboard(reminder_id: str):
         )
     )
     return builder.as_markup()
-
-def restore_reminders():
-    for user_id, user_reminders in reminders.items():
-        for reminder_name, data in user_reminders.items():
-            try:
-                hour, minute = map(int, data['time'].split(':'))
-                
-                scheduler.add_job(
-                    send_scheduled_message,
-                    'cron',
-                    hour=hour,
-                    minute=minute,
-                    args=[int(user_id), user_id, reminder_name],
-                    timezone='Europe/Kaliningrad',
-                    id=data['job_id']
-                )
-            except Exception as e:
-                logger.error(f"Ошибка восстановления напоминания: {e}")
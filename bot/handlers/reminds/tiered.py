@@ -0,0 +1,267 @@
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterator, Optional
+from zoneinfo import ZoneInfo
+
+from bot.handlers.reminds.buckets import TIMEZONE
+from bot.handlers.reminds.model import Reminder, ReminderStore, dump_user, parse_id
+
+
+class TieredStore(ReminderStore):
+    """Хранилище напоминаний в два уровня: LRU горячих пользователей в памяти
+    и холодные страницы в SQLite-файле ``path``, по строке JSON на пользователя.
+
+    Пользователь подгружается в память при первом обращении и вытесняется,
+    когда горячих больше ``max_users``. Пользователей, у которых что-то
+    срабатывает в ближайшие ``horizon`` секунд, ``preload`` заранее поднимает
+    в отдельный закрепленный набор не больше ``max_pinned``, где они не
+    вытесняются; еженедельные и ежемесячные для этого проверяются только
+    по времени суток, с запасом. Время срабатываний лежит рядом со страницами
+    в таблице ``wakeups`` и обновляется при каждом изменении пользователя.
+
+    Источник истины - журнал: файл страниц пересоздается при каждом запуске,
+    поэтому пишется без fsync. Измененный пользователь записывается
+    на страницу при вытеснении. Напоминания холодных пользователей, полученные
+    обходом хранилища, - временные копии, менять их бесполезно.
+    """
+
+    def __init__(self, path: str, max_users: int = 100000, max_pinned: int = 10000, horizon: int = 3600):
+        super().__init__()
+        self.path = path
+        self.max_users = max_users
+        self.max_pinned = max_pinned
+        self.horizon = horizon
+        self._users: OrderedDict[int, dict[int, Reminder]] = OrderedDict()
+        self._pinned: dict[int, dict[int, Reminder]] = {}
+        self._dirty: set[int] = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.pin_overflow = 0
+        self._db = self._open()
+
+    def _open(self) -> sqlite3.Connection:
+        for suffix in ("", "-journal"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+        db = sqlite3.connect(self.path, isolation_level=None)
+        db.execute("PRAGMA journal_mode=OFF")
+        db.execute("PRAGMA synchronous=OFF")
+        db.execute("CREATE TABLE pages (user_id INTEGER PRIMARY KEY, reminders TEXT NOT NULL)")
+        # minute: у повторяющихся - минута суток (< 1440), у однократных - минута от эпохи
+        db.execute(
+            "CREATE TABLE wakeups (minute INTEGER NOT NULL, user_id INTEGER NOT NULL, "
+            "PRIMARY KEY (minute, user_id)) WITHOUT ROWID"
+        )
+        db.execute("CREATE INDEX wakeups_user ON wakeups (user_id)")
+        return db
+
+    # --- страницы -------------------------------------------------------------
+
+    def _decode(self, user_id: int, page: str) -> dict[int, Reminder]:
+        user_reminders = {}
+        for key, data in json.loads(page).items():
+            reminder_id = parse_id(key)
+            user_reminders[reminder_id] = self._adopt(Reminder.from_dict(user_id, reminder_id, data))
+        return user_reminders
+
+    @staticmethod
+    def _encode(data: dict) -> str:
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+    def _write(self, user_id: int, user_reminders: dict[int, Reminder]):
+        self._db.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?)", (user_id, self._encode(dump_user(user_reminders)))
+        )
+
+    @staticmethod
+    def _wakeups(user_id: int, user_reminders) -> set[tuple[int, int]]:
+        return {
+            (reminder.hour * 60 + reminder.minute if reminder.frequency.recurring else int(reminder.next_run // 60), user_id)
+            for reminder in user_reminders
+            if reminder.active
+        }
+
+    def _index(self, user_id: int):
+        """Переписывает время срабатываний пользователя, который сейчас в памяти"""
+        user_reminders = self._pinned.get(user_id) or self._users.get(user_id) or {}
+        self._db.execute("DELETE FROM wakeups WHERE user_id = ?", (user_id,))
+        self._db.executemany("INSERT OR IGNORE INTO wakeups VALUES (?, ?)", self._wakeups(user_id, user_reminders.values()))
+
+    # --- уровни ---------------------------------------------------------------
+
+    def _read(self, user_id: int) -> Optional[dict[int, Reminder]]:
+        row = self._db.execute("SELECT reminders FROM pages WHERE user_id = ?", (user_id,)).fetchone()
+        return None if row is None else self._decode(user_id, row[0])
+
+    def _user(self, user_id: int, create: bool = False) -> Optional[dict[int, Reminder]]:
+        user_reminders = self._pinned.get(user_id)
+        if user_reminders is not None:
+            self.hits += 1
+            return user_reminders
+        user_reminders = self._users.get(user_id)
+        if user_reminders is not None:
+            self.hits += 1
+            self._users.move_to_end(user_id)
+            return user_reminders
+
+        self.misses += 1
+        user_reminders = self._read(user_id)
+        if user_reminders is None:
+            if not create:
+                return None
+            user_reminders = {}
+            self._dirty.add(user_id)
+        self._users[user_id] = user_reminders
+        self._evict()
+        return user_reminders
+
+    def _drop(self, user_id: int):
+        if self._pinned.pop(user_id, None) is None:
+            del self._users[user_id]
+        self._dirty.discard(user_id)
+        self._db.execute("DELETE FROM pages WHERE user_id = ?", (user_id,))
+        self._db.execute("DELETE FROM wakeups WHERE user_id = ?", (user_id,))
+
+    def _evict(self):
+        # Закрепленные лежат отдельно, поэтому самый давний всегда можно вытеснить
+        while len(self._users) > self.max_users:
+            user_id, user_reminders = self._users.popitem(last=False)
+            if user_id in self._dirty:
+                self._write(user_id, user_reminders)
+                self._dirty.discard(user_id)
+            self.evictions += 1
+
+    def _due_users(self, now: float) -> list[int]:
+        """Пользователи, у которых что-то срабатывает в ближайшие ``horizon`` секунд"""
+        local = datetime.fromtimestamp(now, ZoneInfo(TIMEZONE))
+        start = local.hour * 60 + local.minute
+        end = start + self.horizon // 60
+        if end - start >= 1439:
+            ranges = [(0, 1439)]
+        elif end < 1440:
+            ranges = [(start, end)]
+        else:
+            ranges = [(start, 1439), (0, end - 1440)]
+        ranges.append((int(now // 60), int((now + self.horizon) // 60)))
+        due = {}
+        for low, high in ranges:
+            for (user_id,) in self._db.execute(
+                "SELECT user_id FROM wakeups WHERE minute BETWEEN ? AND ? ORDER BY minute", (low, high)
+            ):
+                due.setdefault(user_id, None)
+        return list(due)
+
+    def preload(self, now: float = None) -> int:
+        """Закрепляет в памяти пользователей, у которых скоро что-то сработает,
+        и отпускает тех, у кого уже нет. Возвращает число поднятых с диска"""
+        now = time.time() if now is None else now
+        due = self._due_users(now)
+        wanted = set(due)
+        for user_id in [user_id for user_id in self._pinned if user_id not in wanted]:
+            # Отпущенный становится самым свежим в LRU и вытесняется на общих правах
+            self._users[user_id] = self._pinned.pop(user_id)
+        loaded = 0
+        for user_id in due:
+            if user_id in self._pinned:
+                continue
+            if len(self._pinned) >= self.max_pinned:
+                self.pin_overflow += 1
+                continue
+            user_reminders = self._users.pop(user_id, None)
+            if user_reminders is None:
+                user_reminders = self._read(user_id)
+                if user_reminders is None:
+                    continue
+                loaded += 1
+            self._pinned[user_id] = user_reminders
+        self._evict()
+        return loaded
+
+    def _all_users(self) -> Iterator[tuple[int, dict[int, Reminder]]]:
+        yield from list(self._pinned.items())
+        yield from list(self._users.items())
+        for user_id, page in self._db.execute("SELECT user_id, reminders FROM pages"):
+            if user_id not in self._users and user_id not in self._pinned:
+                yield user_id, self._decode(user_id, page)
+
+    # --- API хранилища --------------------------------------------------------
+
+    def _in_memory(self, user_id: int) -> bool:
+        return user_id in self._users or user_id in self._pinned
+
+    def add(self, reminder: Reminder) -> Reminder:
+        super().add(reminder)
+        self._dirty.add(reminder.user_id)
+        self._index(reminder.user_id)
+        return reminder
+
+    def remove(self, user_id: int, reminder_id: int) -> Optional[Reminder]:
+        reminder = super().remove(user_id, reminder_id)
+        if reminder is not None and self._in_memory(user_id):
+            self._dirty.add(user_id)
+            self._index(user_id)
+        return reminder
+
+    def mark_dirty(self, user_id: int):
+        if self._in_memory(user_id):
+            self._dirty.add(user_id)
+            self._index(user_id)
+
+    def clear(self):
+        super().clear()
+        self._pinned.clear()
+        self._dirty.clear()
+        self._db.execute("DELETE FROM pages")
+        self._db.execute("DELETE FROM wakeups")
+
+    def load(self, raw: dict) -> int:
+        """Раскладывает словарь хранилища по холодным страницам, возвращает число битых записей"""
+        failed = 0
+        rows = []
+        wakeups = set()
+        self._db.execute("BEGIN")
+        while raw:
+            user_key, user_reminders = raw.popitem()
+            user_id = int(user_key)
+            page = {}
+            parsed = []
+            for reminder_key, data in user_reminders.items():
+                try:
+                    parsed.append(Reminder.from_dict(user_id, parse_id(reminder_key), data))
+                except (KeyError, TypeError, ValueError):
+                    failed += 1
+                    continue
+                page[reminder_key] = data
+            if page:
+                rows.append((user_id, self._encode(page)))
+                wakeups |= self._wakeups(user_id, parsed)
+                self._count += len(page)
+            if len(rows) >= 1000:
+                self._db.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?)", rows)
+                self._db.executemany("INSERT OR IGNORE INTO wakeups VALUES (?, ?)", wakeups)
+                rows.clear()
+                wakeups.clear()
+        self._db.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?)", rows)
+        self._db.executemany("INSERT OR IGNORE INTO wakeups VALUES (?, ?)", wakeups)
+        self._db.execute("COMMIT")
+        return failed
+
+    def stats(self) -> dict:
+        return {
+            "hot_users": len(self._users) + len(self._pinned),
+            "pinned": len(self._pinned),
+            "reminders": self._count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "pin_overflow": self.pin_overflow,
+            "dirty": len(self._dirty),
+        }
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,166 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+from bot.handlers.reminds.buckets import TIMEZONE, make_slot
+from bot.handlers.reminds.model import Frequency, Reminder, Urgency
+from bot.handlers.reminds.parser import parse_reminder
+
+# С запасом на лимит напоминаний пользователя
+IMPORT_MAX_BYTES = 2**20
+EXPORT_FIELDS = ("when", "text", "urgent", "active", "day")
+
+_TRUE = {"1", "true", "yes", "да", "+"}
+
+
+class ImportEntry(NamedTuple):
+    """Строка импорта: текст в грамматике /add и необязательные поля"""
+    number: int
+    line: str
+    urgent: bool = False
+    active: bool = True
+    day: Optional[str] = None  # день недели или месяца для повторяющихся, как в файле
+
+
+def _flag(value, default: bool) -> bool:
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in _TRUE
+
+
+def _day(value) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError("Некорректный день") from None
+
+
+def _entry(number: int, item) -> ImportEntry:
+    # Ошибки отдельных строк всплывают при сборке напоминания, а не здесь,
+    # чтобы одна плохая строка не обрывала весь файл
+    if not isinstance(item, dict):
+        return ImportEntry(number, item if isinstance(item, str) else "")
+    return ImportEntry(
+        number,
+        f"{item.get('when') or ''} {item.get('text') or ''}",
+        _flag(item.get("urgent"), False),
+        _flag(item.get("active"), True),
+        item.get("day"),
+    )
+
+
+def iter_text(lines: Iterator[str]) -> Iterator[ImportEntry]:
+    """По напоминанию на строку, как в /add; пустые строки и # комментарии пропускаются"""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield ImportEntry(number, line)
+
+
+def iter_csv(lines: Iterator[str]) -> Iterator[ImportEntry]:
+    """CSV с заголовком: when и text обязательны, urgent, active и day - по желанию"""
+    reader = csv.DictReader(lines)
+    try:
+        if reader.fieldnames is None or not {"when", "text"} <= set(reader.fieldnames):
+            raise ValueError("В CSV нужен заголовок с колонками when и text")
+        for row in reader:
+            # Номер строки файла с учетом заголовка
+            yield _entry(reader.line_num, row)
+    except csv.Error as e:
+        raise ValueError(f"Ошибка CSV в строке {reader.line_num}: {e}") from None
+
+
+def iter_json(stream: BinaryIO) -> Iterator[ImportEntry]:
+    """Список строк в грамматике /add или объектов с полями как в CSV"""
+    items = json.load(stream)
+    if not isinstance(items, list):
+        raise ValueError("В JSON ожидается список напоминаний")
+    for number, item in enumerate(items, 1):
+        yield _entry(number, item)
+
+
+def iter_entries(stream: BinaryIO, filename: str = "") -> Iterator[ImportEntry]:
+    """Строки импорта из файла; формат определяется по расширению, по умолчанию - текст.
+
+    Файл читается построчно. Ошибка всего файла (кодировка, битый JSON или
+    CSV) - ValueError; строки до нее уже выданы.
+    """
+    name = filename.lower()
+    try:
+        if name.endswith(".json"):
+            yield from iter_json(stream)
+            return
+        lines = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        yield from iter_csv(lines) if name.endswith(".csv") else iter_text(lines)
+    except UnicodeDecodeError:
+        raise ValueError("Файл должен быть в кодировке UTF-8") from None
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Некорректный JSON в строке {e.lineno}") from None
+
+
+def build_reminder(entry: ImportEntry, user_id: int, chat_id: int, reminder_id: int, now: datetime, created_at: int) -> Reminder:
+    """Напоминание по строке импорта; ошибки формата - ValueError с текстом для пользователя"""
+    parsed = parse_reminder(entry.line, now)
+    hour = minute = day = next_run = None
+    if parsed.frequency is Frequency.ONCE:
+        next_run = (now + parsed.delay if parsed.delay is not None else parsed.run_at).timestamp()
+    else:
+        hour, minute = parsed.hour, parsed.minute
+        day = make_slot(parsed.frequency, hour, minute, now).day
+        entry_day = _day(entry.day)
+        if entry_day is not None and parsed.frequency is not Frequency.DAILY:
+            low, high = (0, 6) if parsed.frequency is Frequency.WEEKLY else (1, 31)
+            if not low <= entry_day <= high:
+                raise ValueError("Некорректный день")
+            day = entry_day
+    return Reminder(
+        user_id,
+        reminder_id,
+        chat_id,
+        parsed.text,
+        parsed.frequency,
+        Urgency.URGENT if entry.urgent else Urgency.NORMAL,
+        entry.active,
+        hour,
+        minute,
+        day,
+        next_run,
+        created_at,
+    )
+
+
+def describe_when(reminder: Reminder) -> str:
+    """Время напоминания в грамматике /add, чтобы экспорт можно было импортировать обратно"""
+    if reminder.frequency.recurring:
+        return f"{reminder.frequency.label} {reminder.hour:02d}:{reminder.minute:02d}"
+    return datetime.fromtimestamp(reminder.next_run, ZoneInfo(TIMEZONE)).strftime("%d.%m.%Y %H:%M")
+
+
+def export_rows(items: list[Reminder]) -> Iterator[dict]:
+    for reminder in items:
+        yield {
+            "when": describe_when(reminder),
+            "text": reminder.text,
+            "urgent": reminder.urgent,
+            "active": reminder.active,
+            "day": reminder.day if reminder.frequency in (Frequency.WEEKLY, Frequency.MONTHLY) else None,
+        }
+
+
+def export_csv(items: list[Reminder]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, EXPORT_FIELDS)
+    writer.writeheader()
+    writer.writerows(export_rows(items))
+    return buffer.getvalue().encode("utf-8")
+
+
+def export_json(items: list[Reminder]) -> bytes:
+    return json.dumps(list(export_rows(items)), ensure_ascii=False, indent=1).encode("utf-8")
@@ -1,10 +1,8 @@
-import asyncio
-
 from aiogram import types
 from aiogram.filters import Command
 from aiogram.types import Message
 
-from bot import dp
+from bot import dp, cleanup
 
 from bot.logs.logging_config import logger
 
@@ -17,18 +15,24 @@ async def cmd_start(message: Message):
                          "<code>/check</code> Чтобы посмотреть напоминания!", parse_mode="HTML")
 
 @dp.errors()
-async def errors_handler(update: types.Update, exception: Exception):
-    logger.error(f"Ошибка: {exception}", exc_info=True)
+async def errors_handler(event: types.ErrorEvent):
+    # aiogram 3 передает обновление и исключение одним ErrorEvent
+    user = getattr(event.update.event, "from_user", None)
+    logger.error(
+        f"Ошибка: {event.exception}",
+        exc_info=event.exception,
+        extra={"user_id": user.id if user else None},
+    )
     return True
 
 @dp.message()
 async def echo(message: Message):
-    logger.info(f"Пользователь {message.from_user.id} написал: {message.text}")
-    try:
-        await message.delete()
-        notification = await message.answer(text="Пожалуйста, используйте доступные команды", show_alert=True)
-        await asyncio.sleep(3)
-        await notification.delete()
-    except Exception as e:
-        logger.error(f"Не удалось удалить сообщение: {e}")
+    # Текст не пишем: под спамом это основной объем лога
+    logger.info(
+        f"Пользователь {message.from_user.id} написал не команду",
+        extra={"event": "echo", "user_id": message.from_user.id, "length": len(message.text or "")},
+    )
+    # Удаление и подсказка копятся по чату и уходят пачкой, обработчик не ждет
+    cleanup.delete_later(message.chat.id, message.message_id)
+    cleanup.notify(message.chat.id, "Пожалуйста, используйте доступные команды")
         
\ No newline at end of file
@@ -1,15 +1,139 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
 Path("bot/logs").mkdir(exist_ok=True)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("bot/logs/bot.log", encoding="utf-8"),
-        logging.StreamHandler(),
-    ],
-)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FILE = os.getenv("LOG_FILE", "bot/logs/bot.log")
+# Ротация по размеру: LOG_MAX_BYTES на файл и LOG_BACKUPS старых файлов
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 2**20)))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "5"))
+# json - запись на строку для сборщиков логов, text - как раньше
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Записи, не влезшие в очередь, отбрасываются: лог не должен тормозить бота
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Массовые события (extra={"event": ...}): не больше LOG_EVENT_RATE записей в секунду
+# на событие, всплеск до LOG_EVENT_BURST; 0 - без ограничения
+LOG_EVENT_RATE = float(os.getenv("LOG_EVENT_RATE", "5"))
+LOG_EVENT_BURST = float(os.getenv("LOG_EVENT_BURST", "20"))
 
-logger = logging.getLogger(__name__)
\ No newline at end of file
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Атрибуты, которые есть у любой LogRecord; остальное пришло через extra
+_STANDARD = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись; поля из extra (user_id, reminder_id, event...) - на верхнем уровне"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD:
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class EventRateLimit(logging.Filter):
+    """Token bucket на каждое значение record.event. Следующая пропущенная
+    запись события несет в поле suppressed число отброшенных перед ней.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[str, list] = {}  # event -> [токены, время, отброшено]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        if event is None or self.rate <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(event)
+            if bucket is None:
+                bucket = self._buckets[event] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Кладет запись в очередь для фонового потока; при переполнении отбрасывает"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # В отличие от базового класса не форматируем здесь: форматтер у каждого
+        # обработчика свой, а в этом потоке делаем только неизбежное - подставляем
+        # аргументы и снимаем traceback, пока он жив
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _setup() -> tuple[NonBlockingQueueHandler, QueueListener]:
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+    file_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    handler.addFilter(EventRateLimit(LOG_EVENT_RATE, LOG_EVENT_BURST))
+    listener = QueueListener(handler.queue, file_handler, console_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(handler)
+    listener.start()
+    # Дописываем очередь при выходе
+    atexit.register(listener.stop)
+    return handler, listener
+
+
+log_handler, log_listener = _setup()
+
+# APScheduler пишет INFO на каждую добавленную и выполненную задачу
+logging.getLogger("apscheduler").setLevel(logging.WARNING)
+# aiogram пишет INFO на каждое обработанное обновление - под нагрузкой это весь лог
+logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+
+logger = logging.getLogger(__name__)
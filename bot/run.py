@@ -1,24 +1,63 @@
 import asyncio
+import os
 
-from bot import dp, bot, scheduler
+from bot import dp, bot, bots, session, scheduler, delivery, cleanup
 from bot.logs.logging_config import logger
-from bot.handlers.reminds.storage import restore_reminders
+from bot.handlers.reminds.storage import persistence, nag, reminders, checkpoint
+from bot.handlers.reminds import restore
+from bot.handlers.reminds.restore import restore_reminders
+from bot.webhook import run_webhook
+from bot.sharding import run_shard
+from bot.utils.metrics import monitor_loop_lag, start_metrics_server
 
 from bot.handlers.reminds.reminds import *
 from bot.handlers.user.users import *
 
+# Порт /metrics; без него метрики собираются, но наружу не отдаются
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
 
 async def main():
+    metrics = loop_lag = None
     try:
         logger.info("Бот запущен!")
+        if METRICS_PORT:
+            metrics = await start_metrics_server(METRICS_HOST, int(METRICS_PORT))
+            loop_lag = asyncio.create_task(monitor_loop_lag())
         restore_reminders() 
+        delivery.start()
         scheduler.start()
-        await dp.start_polling(bot)
+        persistence.start()
+        nag.start()
+        checkpoint.start(nag.snapshot, progress=restore.catch_up_progress)
+        # BOT_MODE=webhook - прием обновлений через вебхук, shard - от фронта
+        # шардов (python -m bot.sharding), иначе long polling
+        mode = os.getenv("BOT_MODE", "polling")
+        if mode == "webhook":
+            await run_webhook(bots, dp)
+        elif mode == "shard":
+            await run_shard(bot, dp)
+        else:
+            await dp.start_polling(*bots)
     except Exception as e:
         logger.critical(f"Бот упал с ошибкой: {e}")
     finally:
+        await restore.stop_catch_up()
+        await nag.stop()
+        await checkpoint.stop(nag.snapshot)
+        checkpoint.close()
         scheduler.shutdown()
-        await bot.session.close()
+        await persistence.stop()
+        cleanup.stop()
+        logger.info(f"Кэш напоминаний: {reminders.stats()}")
+        reminders.close()
+        await delivery.stop()
+        await session.close()
+        if loop_lag is not None:
+            loop_lag.cancel()
+        if metrics is not None:
+            await metrics.cleanup()
         logger.info("Бот остановлен")
 
 
@@ -0,0 +1,344 @@
+"""Шардированный режим: пользователи делятся между N процессами-воркерами.
+
+Фронт (``python -m bot.sharding``) сам принимает обновления Telegram - long
+polling или вебхуком - и пересылает каждое воркеру, владеющему пользователем,
+через unix-сокет. Воркер - обычный ``python -m bot.run`` с ``BOT_MODE=shard``:
+у него свое хранилище ``REMINDERS_FILE``, свой планировщик и своя очередь
+отправки, напоминания чужих пользователей он не видит и не запускает.
+
+Раскладка хранится в ``shards.json`` рядом с хранилищем. При изменении
+SHARD_COUNT фронт до запуска воркеров перекладывает напоминания в новые
+разделы; переключение на новую раскладку атомарно, см. ``rebalance``.
+"""
+import asyncio
+import json
+import os
+import secrets
+import signal
+import sys
+import zlib
+
+from aiohttp import ClientError, ClientSession, UnixConnector, web
+from aiogram import Bot, Dispatcher
+
+from bot import bot, bots
+from bot.logs.logging_config import LOG_FILE, logger
+from bot.handlers.reminds.journal import ReminderJournal
+from bot.handlers.reminds.checkpoint import ScheduleCheckpoint
+from bot.utils.metrics import start_metrics_server
+
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", "0"))
+SHARD_SOCKET_DIR = os.getenv("SHARD_SOCKET_DIR", "shards")
+# Общий файл хранилища без шардирования; разделы лежат рядом с ним
+REMINDERS_FILE = os.getenv("REMINDERS_FILE", "reminders.json")
+# Сколько обновлений фронт держит в очереди к одному воркеру, пока тот перезапускается
+SHARD_QUEUE_SIZE = int(os.getenv("SHARD_QUEUE_SIZE", "10000"))
+
+
+def check_single_bot():
+    """Шарды делят пользователей одного бота; несколько ботов в этом режиме не поддерживаются"""
+    if len(bots) > 1:
+        raise RuntimeError("Шардирование работает с одним ботом: задайте BOT_TOKEN вместо BOT_TOKENS")
+
+
+def shard_for(user_id, count: int) -> int:
+    """Номер шарда пользователя: crc32 не зависит от PYTHONHASHSEED и процесса"""
+    return zlib.crc32(str(user_id).encode()) % count
+
+
+def partition_path(base: str, index: int, count: int) -> str:
+    """Файл раздела; единственный раздел - это обычное хранилище без шардов"""
+    if count == 1:
+        return base
+    return f"{base}.{index}-of-{count}"
+
+
+def socket_path(index: int) -> str:
+    return os.path.join(SHARD_SOCKET_DIR, f"shard{index}.sock")
+
+
+def update_user(update: dict):
+    """user_id отправителя обновления или None для обновлений без пользователя"""
+    for value in update.values():
+        if isinstance(value, dict):
+            sender = value.get("from") or value.get("user")
+            if isinstance(sender, dict) and "id" in sender:
+                return sender["id"]
+    return None
+
+
+# --- раскладка и перебалансировка ----------------------------------------
+
+def _layout_path(base: str) -> str:
+    return os.path.join(os.path.dirname(base) or ".", "shards.json")
+
+
+def read_layout(base: str) -> int:
+    """Число шардов, под которое разложены данные на диске"""
+    path = _layout_path(base)
+    if not os.path.exists(path):
+        return 1
+    with open(path, 'r', encoding='utf-8') as f:
+        return int(json.load(f)["count"])
+
+
+def _write_layout(base: str, count: int):
+    path = _layout_path(base)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"count": count}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _remove_partitions(base: str, count: int):
+    for index in range(count):
+        partition = partition_path(base, index, count)
+        # Контрольная точка расписания относится к старой раскладке: без нее
+        # новый раздел восстанавливается по одному журналу
+        for path in ReminderJournal(partition).files() + ScheduleCheckpoint.files(f"{partition}.schedule"):
+            os.remove(path)
+
+
+def rebalance(base: str, count: int) -> int:
+    """Перекладывает напоминания под ``count`` шардов, возвращает число перенесенных пользователей.
+
+    Порядок шагов делает перебалансировку безопасной при падении в любой момент:
+    новые разделы пишутся рядом со старыми, затем атомарно переписывается
+    shards.json, и только после этого удаляются старые разделы. До переключения
+    действует старая раскладка, после - новая; недописанные файлы другой
+    раскладки перезаписываются при следующем запуске. Воркеры в это время
+    не работают - перебалансировку вызывает фронт до их запуска.
+    """
+    current = read_layout(base)
+    if current == count:
+        return 0
+
+    partitions = [{} for _ in range(count)]
+    moved = 0
+    for index in range(current):
+        for user_id, user_reminders in ReminderJournal(partition_path(base, index, current)).read().items():
+            target = shard_for(user_id, count)
+            partitions[target][user_id] = user_reminders
+            moved += target != index
+
+    for index, reminders in enumerate(partitions):
+        journal = ReminderJournal(partition_path(base, index, count))
+        journal.snapshot(reminders)
+        journal.close()
+    _write_layout(base, count)
+    _remove_partitions(base, current)
+    logger.info(f"Шарды перебалансированы: {current} -> {count}, перенесено пользователей: {moved}")
+    return moved
+
+
+# --- воркер ----------------------------------------------------------------
+
+async def run_shard(bot: Bot, dispatcher: Dispatcher, stop: asyncio.Event = None):
+    """Принимает от фронта обновления своего шарда через unix-сокет.
+
+    Отвечает сразу, обработка идет в фоне - как у вебхука с handle_in_background.
+    SIGTERM от фронта завершает сервер штатно, чтобы main успел сбросить журнал.
+    """
+    check_single_bot()
+    stop = stop or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+
+    tasks = set()
+
+    async def handle(request: web.Request) -> web.Response:
+        update = await request.json()
+        task = asyncio.create_task(dispatcher.feed_raw_update(bot, update))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post("/update", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    path = socket_path(SHARD_INDEX)
+    if os.path.exists(path):
+        os.remove(path)
+    await web.UnixSite(runner, path).start()
+    logger.info(f"Шард {SHARD_INDEX}/{SHARD_COUNT} слушает {path}")
+    try:
+        await stop.wait()
+    finally:
+        await runner.cleanup()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# --- фронт -------------------------------------------------------------------
+
+class Shard:
+    """Процесс-воркер и очередь обновлений к нему"""
+
+    def __init__(self, index: int, count: int, env: dict):
+        self.index = index
+        self.count = count
+        self.env = env
+        self.queue: asyncio.Queue = asyncio.Queue(SHARD_QUEUE_SIZE)
+        self.process = None
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [
+            asyncio.create_task(self._supervise(), name=f"shard-{self.index}-process"),
+            asyncio.create_task(self._forward(), name=f"shard-{self.index}-forward"),
+        ]
+
+    async def _supervise(self):
+        env = dict(
+            self.env,
+            BOT_MODE="shard",
+            SHARD_INDEX=str(self.index),
+            SHARD_COUNT=str(self.count),
+            REMINDERS_FILE=partition_path(REMINDERS_FILE, self.index, self.count),
+            # Ротация файла из нескольких процессов ломается: у каждого шарда свой лог
+            LOG_FILE="{0}.shard{2}{1}".format(*os.path.splitext(LOG_FILE), self.index),
+        )
+        # Фронт отдает /metrics на METRICS_PORT, воркеры - на следующих портах
+        if env.get("METRICS_PORT"):
+            env["METRICS_PORT"] = str(int(env["METRICS_PORT"]) + 1 + self.index)
+        while True:
+            self.process = await asyncio.create_subprocess_exec(sys.executable, "-m", "bot.run", env=env)
+            code = await self.process.wait()
+            logger.error(f"Шард {self.index} завершился с кодом {code}, перезапуск")
+            await asyncio.sleep(1)
+
+    async def _forward(self):
+        # Один отправитель на шард сохраняет порядок обновлений каждого пользователя
+        async with ClientSession(connector=UnixConnector(path=socket_path(self.index))) as session:
+            while True:
+                update = await self.queue.get()
+                delay = 0.05
+                while True:
+                    try:
+                        async with session.post("http://shard/update", json=update) as response:
+                            response.raise_for_status()
+                        break
+                    except (ClientError, OSError):
+                        # Воркер еще стартует или перезапускается - ждем его
+                        await asyncio.sleep(delay)
+                        delay = min(delay * 2, 2.0)
+
+    def route(self, update: dict):
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            logger.warning(f"Очередь шарда {self.index} переполнена, обновление {update.get('update_id')} отброшено")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.process is not None and self.process.returncode is None:
+            self.process.terminate()
+            await self.process.wait()
+
+
+class Front:
+    """Принимает обновления Telegram и раздает их шардам по user_id"""
+
+    def __init__(self, count: int):
+        self.count = count
+        env = dict(os.environ)
+        # Лимит Telegram общий на токен - делим его между воркерами
+        global_rate = float(os.getenv("DELIVERY_GLOBAL_RATE", "30"))
+        env["DELIVERY_GLOBAL_RATE"] = str(global_rate / count)
+        self.shards = [Shard(index, count, env) for index in range(count)]
+
+    def route(self, update: dict):
+        user_id = update_user(update)
+        # Обновления без пользователя (например, статус бота в чате) - первому шарду
+        index = shard_for(user_id, self.count) if user_id is not None else 0
+        self.shards[index].route(update)
+
+    async def poll(self, bot: Bot, stop: asyncio.Event):
+        await bot.delete_webhook()
+        offset = None
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=30)
+            except Exception as e:
+                logger.error(f"Ошибка получения обновлений: {e}")
+                await asyncio.sleep(1)
+                continue
+            for update in updates:
+                offset = update.update_id + 1
+                self.route(update.model_dump(mode="json", by_alias=True, exclude_unset=True))
+
+    async def webhook(self, bot: Bot, stop: asyncio.Event):
+        from bot.webhook import (
+            WEBHOOK_HOST, WEBHOOK_MAX_CONNECTIONS, WEBHOOK_PATH, WEBHOOK_PORT, WEBHOOK_SECRET, WEBHOOK_URL,
+        )
+
+        async def handle(request: web.Request) -> web.Response:
+            token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+            if not secrets.compare_digest(token, WEBHOOK_SECRET):
+                return web.Response(status=401)
+            self.route(await request.json())
+            return web.Response()
+
+        app = web.Application()
+        app.router.add_post(WEBHOOK_PATH, handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+        try:
+            await bot.set_webhook(
+                url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET,
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+            )
+            logger.info(f"Фронт шардов слушает вебхук {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+            await stop.wait()
+        finally:
+            await runner.cleanup()
+
+    async def run(self, bot: Bot, stop: asyncio.Event = None):
+        stop = stop or asyncio.Event()
+        os.makedirs(SHARD_SOCKET_DIR, exist_ok=True)
+        rebalance(REMINDERS_FILE, self.count)
+        for shard in self.shards:
+            shard.start()
+        logger.info(f"Запущено шардов: {self.count}")
+        # Долгий опрос не замечает stop до ответа Telegram - прием просто отменяется
+        receive = self.webhook if os.getenv("WEBHOOK_URL") else self.poll
+        receiving = asyncio.create_task(receive(bot, stop))
+        try:
+            await asyncio.wait((receiving, asyncio.create_task(stop.wait())), return_when=asyncio.FIRST_COMPLETED)
+            if receiving.done():
+                receiving.result()
+        finally:
+            receiving.cancel()
+            await asyncio.gather(receiving, return_exceptions=True)
+            await asyncio.gather(*(shard.stop() for shard in self.shards))
+
+
+async def main():
+    check_single_bot()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    metrics = None
+    if os.getenv("METRICS_PORT"):
+        metrics = await start_metrics_server(os.getenv("METRICS_HOST", "127.0.0.1"), int(os.getenv("METRICS_PORT")))
+    try:
+        await Front(SHARD_COUNT).run(bot, stop)
+    finally:
+        await bot.session.close()
+        if metrics is not None:
+            await metrics.cleanup()
+        logger.info("Фронт шардов остановлен")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+import json
+import os
+from contextvars import ContextVar
+from typing import Optional
+
+from aiogram import BaseMiddleware, Bot
+
+# Id пользователей и чатов Telegram укладываются в 52 бита, старшие биты
+# ключа пользователя в хранилище - номер пространства имен бота
+NAMESPACE_SHIFT = 52
+MAX_NAMESPACES = 2 ** (63 - NAMESPACE_SHIFT)
+
+# Бот, чье обновление сейчас обрабатывается; по нему очередь доставки
+# выбирает, от чьего имени отвечать
+current_bot: ContextVar[Optional[Bot]] = ContextVar("current_bot", default=None)
+
+
+class Tenants:
+    """Боты процесса и их пространства имен в общем хранилище.
+
+    Напоминания всех ботов лежат в одном хранилище, журнале и планировщике;
+    ключ пользователя - ``namespace << 52 | user_id``. Номера пространств
+    закреплены за id ботов в ``path`` и не зависят от порядка токенов; файл
+    пишется и с одним ботом. Пространство 0, ключи которого совпадают с id
+    пользователей, достается боту ``legacy_id`` (старый BOT_TOKEN), а без
+    него - первому: данные, созданные до многоботового режима, остаются его.
+    """
+
+    def __init__(self, bots: list[Bot], path: str = "bots.json", legacy_id: Optional[int] = None):
+        self.path = path
+        self.bots = bots
+        namespaces = self._read()
+        known = dict(namespaces)
+        if not namespaces and legacy_id is not None and any(bot.id == legacy_id for bot in bots):
+            namespaces[str(legacy_id)] = 0
+        for bot in bots:
+            if str(bot.id) not in namespaces:
+                namespaces[str(bot.id)] = max(namespaces.values(), default=-1) + 1
+        if max(namespaces.values(), default=0) >= MAX_NAMESPACES:
+            raise ValueError(f"Больше {MAX_NAMESPACES} ботов не поддерживается")
+        if namespaces != known:
+            self._write(namespaces)
+        self._namespaces = {bot.id: namespaces[str(bot.id)] for bot in bots}
+        self._bots = {namespaces[str(bot.id)]: bot for bot in bots}
+
+    def _read(self) -> dict[str, int]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write(self, namespaces: dict[str, int]):
+        # Воркеры шардов стартуют одновременно: у каждого процесса свой временный файл
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(namespaces, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def owner(self, bot: Bot, user_id: int) -> int:
+        """Ключ пользователя бота в хранилище"""
+        return self._namespaces[bot.id] << NAMESPACE_SHIFT | user_id
+
+    def bot_for(self, owner: int) -> Optional[Bot]:
+        """Бот, которому принадлежит ключ; None - его токена больше нет в настройках"""
+        return self._bots.get(owner >> NAMESPACE_SHIFT)
+
+
+class BotContext(BaseMiddleware):
+    """Запоминает бота обновления в ``current_bot`` на время его обработки"""
+
+    async def __call__(self, handler, event, data):
+        token = current_bot.set(data["bot"])
+        try:
+            return await handler(event, data)
+        finally:
+            current_bot.reset(token)
@@ -0,0 +1,91 @@
+import asyncio
+
+from aiogram import Bot
+
+from bot.logs.logging_config import logger
+from bot.tenants import current_bot
+from bot.utils.delivery import DeliveryQueue, Priority
+
+# Больше за один вызов deleteMessages Telegram не принимает
+DELETE_BATCH = 100
+
+
+class _Window:
+    __slots__ = ("bot", "message_ids", "notified", "timer")
+
+    def __init__(self, bot: Bot, timer: asyncio.TimerHandle):
+        self.bot = bot
+        self.message_ids: list[int] = []
+        self.notified = False
+        self.timer = timer
+
+
+class MessageCleanup:
+    """Отложенное удаление сообщений пачками по чатам.
+
+    Первое сообщение на удаление открывает для чата окно в ``window`` секунд;
+    все, что попало в окно, удаляется одним вызовом deleteMessages при его
+    закрытии. Подсказка в чат отправляется один раз за окно и удаляется вместе
+    с остальными. Вместо задачи на каждое сообщение - один таймер на чат,
+    вызовы Bot API идут через очередь доставки с ее лимитами. Окна ведутся
+    отдельно для каждого бота: удалить сообщение может только тот, кто его видел.
+    """
+
+    def __init__(self, delivery: DeliveryQueue, window: float = 3.0):
+        self.delivery = delivery
+        self.window = window
+        self._windows: dict[tuple[int, int], _Window] = {}
+        self.deleted = 0
+        self.batches = 0
+        self.collapsed = 0
+
+    def _window(self, chat_id: int, bot: Bot = None) -> _Window:
+        # Без bot - бот обрабатываемого обновления, как в очереди доставки
+        bot = bot or current_bot.get() or self.delivery.bot
+        key = (bot.id, chat_id)
+        window = self._windows.get(key)
+        if window is None:
+            timer = asyncio.get_running_loop().call_later(self.window, self._flush, key)
+            window = self._windows[key] = _Window(bot, timer)
+        return window
+
+    def delete_later(self, chat_id: int, message_id: int, bot: Bot = None):
+        self._window(chat_id, bot).message_ids.append(message_id)
+
+    def notify(self, chat_id: int, text: str, **kwargs):
+        """Отправляет подсказку, если в текущем окне чата ее еще не было, и удаляет ее с окном"""
+        window = self._window(chat_id)
+        if window.notified:
+            self.collapsed += 1
+            return
+        window.notified = True
+        bot = window.bot
+        future = self.delivery.send_message(chat_id, text, bot=bot, **kwargs)
+        future.add_done_callback(lambda done: self._notified(chat_id, bot, done))
+
+    def _notified(self, chat_id: int, bot: Bot, future: asyncio.Future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        # Если отправка затянулась дольше окна, подсказка уйдет со следующим
+        self.delete_later(chat_id, future.result().message_id, bot)
+
+    def _flush(self, key: tuple[int, int]):
+        window = self._windows.pop(key)
+        chat_id, message_ids = key[1], window.message_ids
+        for start in range(0, len(message_ids), DELETE_BATCH):
+            batch = message_ids[start:start + DELETE_BATCH]
+            self.delivery.submit("delete_messages", chat_id, Priority.INFO, bot=window.bot, message_ids=batch)
+            self.deleted += len(batch)
+            self.batches += 1
+
+    @property
+    def pending(self) -> int:
+        return sum(len(window.message_ids) for window in self._windows.values())
+
+    def stop(self):
+        pending = self.pending
+        for window in self._windows.values():
+            window.timer.cancel()
+        self._windows.clear()
+        if pending:
+            logger.warning(f"Очистка остановлена, не удалено сообщений: {pending}")
@@ -0,0 +1,325 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from enum import IntEnum
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from bot.logs.logging_config import logger
+from bot.tenants import current_bot
+from bot.utils.ratelimit import PRUNE_INTERVAL, PRUNE_SIZE, TokenBucket
+from bot.utils.metrics import histogram
+
+delivery_lag = histogram("delivery_lag_seconds", "Задержка от срока сообщения до успешной отправки", ("priority",))
+
+
+# Ошибки, после которых отправку имеет смысл повторить позже
+TEMPORARY_ERRORS = (TelegramRetryAfter, TelegramNetworkError, TelegramServerError)
+
+
+def chat_unreachable(error: BaseException) -> bool:
+    """Писать в чат больше нельзя: бот заблокирован, пользователь удален или чата нет"""
+    if isinstance(error, TelegramForbiddenError):
+        return True
+    return isinstance(error, TelegramBadRequest) and "chat not found" in str(error).lower()
+
+
+class Priority(IntEnum):
+    URGENT = 0
+    NORMAL = 1
+    INFO = 2
+
+
+class _Outgoing:
+    __slots__ = ("bot", "method", "chat_id", "kwargs", "priority", "due", "future", "attempt")
+
+    def __init__(self, bot: Bot, method: str, chat_id: int, kwargs: dict, priority: Priority, due: float, future):
+        self.bot = bot
+        self.method = method
+        self.chat_id = chat_id
+        self.kwargs = kwargs
+        self.priority = priority
+        self.due = due
+        self.future = future
+        self.attempt = 0
+
+
+class DeliveryQueue:
+    """Очередь исходящих сообщений с учетом лимитов Telegram.
+
+    Сообщения уходят в порядке приоритета (срочные напоминания, обычные,
+    информационные ответы), ограниченные общим ведром токенов и ведром на
+    каждый чат. Сообщение для чата без свободного токена откладывается и не
+    задерживает остальные. На 429 очередь ждет ``retry_after``, на сетевые и
+    серверные ошибки повторяет отправку с экспоненциальной задержкой.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        global_rate: float = 30,
+        chat_rate: float = 1,
+        chat_burst: float = 3,
+        concurrency: int = 30,
+        max_attempts: int = 5,
+        backoff: float = 1.0,
+    ):
+        self.bot = bot
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._chats: dict[int, TokenBucket] = {}
+        self._pruned = float("-inf")
+        self._paused: dict[int, float] = {}
+        self._ready: list[tuple[int, int, _Outgoing]] = []
+        self._delayed: list[tuple[float, int, _Outgoing]] = []
+        self._counter = itertools.count()
+        self._slots = asyncio.Semaphore(concurrency)
+        self._wakeup = None
+        self._task = None
+        # Ссылки на задачи отправки, чтобы сборщик мусора не снял их на полпути
+        self._sending: set[asyncio.Task] = set()
+        self._inflight = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.lags = deque(maxlen=1000)
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    @property
+    def depth(self) -> int:
+        """Сколько сообщений ждут отправки"""
+        return len(self._ready) + len(self._delayed)
+
+    def stats(self) -> dict:
+        lags = list(self.lags)
+        return {
+            "queued": self.depth,
+            "inflight": self._inflight,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "lag_avg": sum(lags) / len(lags) if lags else 0.0,
+            "lag_max": max(lags) if lags else 0.0,
+        }
+
+    def submit(
+        self, method: str, chat_id: int, priority: Priority = Priority.INFO, due: float = None, bot: Bot = None, **kwargs
+    ):
+        """Ставит вызов метода Bot API в очередь, возвращает future с результатом.
+
+        Без ``bot`` вызов идет от бота обрабатываемого обновления, вне обработчика - от бота очереди.
+        """
+        future = asyncio.get_running_loop().create_future()
+        bot = bot or current_bot.get() or self.bot
+        item = _Outgoing(bot, method, chat_id, kwargs, priority, time.time() if due is None else due, future)
+        self._push_ready(item)
+        return future
+
+    def send_message(
+        self, chat_id: int, text: str, priority: Priority = Priority.INFO, due: float = None, bot: Bot = None, **kwargs
+    ):
+        return self.submit("send_message", chat_id, priority=priority, due=due, bot=bot, text=text, **kwargs)
+
+    def _push_ready(self, item: _Outgoing):
+        heapq.heappush(self._ready, (item.priority, next(self._counter), item))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _push_delayed(self, item: _Outgoing, delay: float):
+        heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._counter), item))
+
+    def _chat_bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) > PRUNE_SIZE and now - self._pruned >= PRUNE_INTERVAL:
+                # Забываем простаивающие чаты, чтобы словарь не рос бесконечно
+                self._pruned = now
+                self._chats = {key: value for key, value in self._chats.items() if not value.full(now)}
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+        return bucket
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            while self._delayed and self._delayed[0][0] <= now:
+                self._push_ready(heapq.heappop(self._delayed)[2])
+
+            if not self._ready:
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            wait = self.global_bucket.delay(now)
+            if wait:
+                await asyncio.sleep(wait)
+                continue
+
+            item = heapq.heappop(self._ready)[2]
+            paused = self._paused.get(item.chat_id, 0) - now
+            if paused > 0:
+                self._push_delayed(item, paused)
+                continue
+            bucket = self._chat_bucket(item.chat_id, now)
+            if not bucket.take(now):
+                self._push_delayed(item, bucket.delay(now))
+                continue
+            self.global_bucket.take(now)
+
+            await self._slots.acquire()
+            self._inflight += 1
+            task = asyncio.create_task(self._send(item))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, item: _Outgoing):
+        try:
+            result = await getattr(item.bot, item.method)(chat_id=item.chat_id, **item.kwargs)
+        except TelegramRetryAfter as e:
+            self.retried += 1
+            self._paused[item.chat_id] = time.monotonic() + e.retry_after
+            logger.warning(
+                f"Лимит Telegram для чата {item.chat_id}, повтор через {e.retry_after} с",
+                extra={"event": "retry_after", "chat_id": item.chat_id},
+            )
+            self._push_delayed(item, e.retry_after)
+        except (TelegramNetworkError, TelegramServerError) as e:
+            item.attempt += 1
+            if item.attempt >= self.max_attempts:
+                self._fail(item, e)
+            else:
+                self.retried += 1
+                self._push_delayed(item, self.backoff * 2 ** (item.attempt - 1))
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                self._fail(item, e)
+            # Повторное нажатие той же кнопки: менять в сообщении нечего
+            elif not item.future.done():
+                item.future.set_result(None)
+        except Exception as e:
+            self._fail(item, e)
+        else:
+            self.sent += 1
+            lag = time.time() - item.due
+            self.lags.append(lag)
+            delivery_lag.observe(max(lag, 0.0), priority=item.priority.name.lower())
+            if not item.future.done():
+                item.future.set_result(result)
+        finally:
+            self._inflight -= 1
+            self._slots.release()
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    def _fail(self, item: _Outgoing, error: Exception):
+        self.failed += 1
+        logger.error(
+            f"Не удалось отправить сообщение в чат {item.chat_id}: {error}",
+            extra={"event": "delivery_failed", "chat_id": item.chat_id, "method": item.method},
+        )
+        if not item.future.done():
+            item.future.set_exception(error)
+            # Ошибка уже залогирована: не ругаемся, если future никто не ждет
+            item.future.exception()
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.depth:
+            logger.warning(f"Очередь отправки остановлена, не отправлено сообщений: {self.depth}")
+
+
+class MultiDelivery:
+    """Очереди доставки нескольких ботов за интерфейсом одной очереди.
+
+    Лимиты Telegram считаются для каждого бота отдельно, поэтому у каждого
+    своя ``DeliveryQueue``: загруженный бот не задерживает остальных.
+    Вызов уходит в очередь ``bot``, а без него - бота обрабатываемого обновления.
+    """
+
+    def __init__(self, queues: list[DeliveryQueue]):
+        self.queues = queues
+        # Бот по умолчанию - для вызовов вне обработчиков, как у одной очереди
+        self.bot = queues[0].bot
+        self._by_bot = {queue.bot.id: queue for queue in queues}
+
+    def queue(self, bot: Bot = None) -> DeliveryQueue:
+        bot = bot or current_bot.get()
+        return self._by_bot[bot.id] if bot is not None else self.queues[0]
+
+    def submit(
+        self, method: str, chat_id: int, priority: Priority = Priority.INFO, due: float = None, bot: Bot = None, **kwargs
+    ):
+        return self.queue(bot).submit(method, chat_id, priority=priority, due=due, bot=bot, **kwargs)
+
+    def send_message(
+        self, chat_id: int, text: str, priority: Priority = Priority.INFO, due: float = None, bot: Bot = None, **kwargs
+    ):
+        return self.queue(bot).send_message(chat_id, text, priority=priority, due=due, bot=bot, **kwargs)
+
+    @property
+    def inflight(self) -> int:
+        return sum(queue.inflight for queue in self.queues)
+
+    @property
+    def depth(self) -> int:
+        return sum(queue.depth for queue in self.queues)
+
+    @property
+    def sent(self) -> int:
+        return sum(queue.sent for queue in self.queues)
+
+    @property
+    def failed(self) -> int:
+        return sum(queue.failed for queue in self.queues)
+
+    @property
+    def retried(self) -> int:
+        return sum(queue.retried for queue in self.queues)
+
+    def stats(self) -> dict:
+        lags = [lag for queue in self.queues for lag in queue.lags]
+        return {
+            "queued": self.depth,
+            "inflight": self.inflight,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "lag_avg": sum(lags) / len(lags) if lags else 0.0,
+            "lag_max": max(lags) if lags else 0.0,
+        }
+
+    def start(self):
+        for queue in self.queues:
+            queue.start()
+
+    async def stop(self):
+        for queue in self.queues:
+            await queue.stop()
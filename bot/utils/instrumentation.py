@@ -0,0 +1,104 @@
+import time
+from datetime import datetime, timezone
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import (
+    TelegramBadRequest, TelegramForbiddenError, TelegramNetworkError, TelegramRetryAfter, TelegramServerError,
+)
+from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
+
+from bot.logs.logging_config import log_handler
+from bot.utils.metrics import counter, gauge, histogram
+
+telegram_seconds = histogram("telegram_request_seconds", "Длительность вызовов Bot API", ("method",))
+telegram_errors = counter("telegram_errors_total", "Ошибки вызовов Bot API", ("method", "reason"))
+handler_seconds = histogram("handler_seconds", "Длительность обработчиков обновлений", ("handler",))
+handler_errors = counter("handler_errors_total", "Исключения в обработчиках обновлений", ("handler",))
+fire_lag = histogram(
+    "scheduler_fire_lag_seconds", "Опоздание запуска задачи планировщика относительно run_date", ("kind",)
+)
+missed = counter("scheduler_missed_total", "Задачи планировщика, пропущенные из-за misfire_grace_time", ("kind",))
+log_dropped = counter(
+    "log_dropped_total", "Записи лога, отброшенные из-за переполненной очереди", function=lambda: log_handler.dropped
+)
+
+_REASONS = (
+    (TelegramRetryAfter, "retry_after"),
+    (TelegramForbiddenError, "forbidden"),
+    (TelegramBadRequest, "bad_request"),
+    (TelegramServerError, "server"),
+    (TelegramNetworkError, "network"),
+)
+
+
+def _reason(error: Exception) -> str:
+    for error_type, reason in _REASONS:
+        if isinstance(error, error_type):
+            return reason
+    return "other"
+
+
+def _job_kind(job_id: str) -> str:
+    # slot:..., restore:... - служебные задачи, остальные - однократные напоминания
+    prefix, separator, _ = job_id.partition(":")
+    return prefix if separator else "reminder"
+
+
+class TelegramMetrics(BaseRequestMiddleware):
+    """Время и ошибки каждого вызова Bot API, включая отправку из очереди доставки"""
+
+    async def __call__(self, make_request, bot: Bot, method):
+        name = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            telegram_errors.inc(method=name, reason=_reason(e))
+            raise
+        finally:
+            telegram_seconds.observe(time.perf_counter() - started, method=name)
+
+
+class HandlerMetrics(BaseMiddleware):
+    """Время обработчиков; внутренний middleware, поэтому обработчик уже выбран фильтрами"""
+
+    async def __call__(self, handler, event, data):
+        name = data["handler"].callback.__name__
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            handler_errors.inc(handler=name)
+            raise
+        finally:
+            handler_seconds.observe(time.perf_counter() - started, handler=name)
+
+
+def instrument(bot: Bot, dispatcher: Dispatcher, scheduler, delivery, cleanup):
+    """Подключает сбор метрик к синглтонам из bot/__init__.py"""
+    bot.session.middleware(TelegramMetrics())
+    dispatcher.message.middleware(HandlerMetrics())
+    dispatcher.callback_query.middleware(HandlerMetrics())
+
+    def on_submitted(event):
+        now = datetime.now(timezone.utc)
+        for run_time in event.scheduled_run_times:
+            fire_lag.observe(max((now - run_time).total_seconds(), 0.0), kind=_job_kind(event.job_id))
+
+    def on_missed(event):
+        missed.inc(kind=_job_kind(event.job_id))
+
+    scheduler.add_listener(on_submitted, EVENT_JOB_SUBMITTED)
+    scheduler.add_listener(on_missed, EVENT_JOB_MISSED)
+
+    gauge("scheduler_jobs", "Задачи в планировщике", function=lambda: len(scheduler.get_jobs()))
+    gauge("delivery_queue_depth", "Сообщения в очереди доставки", function=lambda: delivery.depth)
+    gauge("delivery_inflight", "Сообщения, отправляемые прямо сейчас", function=lambda: delivery.inflight)
+    counter("delivery_sent_total", "Отправленные очередью доставки сообщения", function=lambda: delivery.sent)
+    counter("delivery_failed_total", "Сообщения, которые не удалось доставить", function=lambda: delivery.failed)
+    counter("delivery_retried_total", "Повторные попытки отправки", function=lambda: delivery.retried)
+    gauge("cleanup_pending", "Сообщения, ждущие удаления", function=lambda: cleanup.pending)
+    counter("cleanup_deleted_total", "Сообщения, поставленные на удаление", function=lambda: cleanup.deleted)
+    counter("cleanup_batches_total", "Вызовы deleteMessages", function=lambda: cleanup.batches)
+    counter("cleanup_notices_collapsed_total", "Подсказки, не отправленные повторно", function=lambda: cleanup.collapsed)
@@ -0,0 +1,46 @@
+import time
+
+# Словари ведер и прочего состояния по чатам чистятся от простаивающих, когда
+# записей больше PRUNE_SIZE, но не чаще раза в PRUNE_INTERVAL секунд: иначе
+# без простаивающих записей каждый новый чат перебирал бы весь словарь
+PRUNE_SIZE = 10000
+PRUNE_INTERVAL = 60.0
+
+
+class TokenBucket:
+    """Классическое ведро токенов: ``rate`` токенов в секунду, не больше ``capacity``"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float = None) -> float:
+        """Через сколько секунд появится токен (0 - уже есть)"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float = None) -> bool:
+        """Забирает токен, если он есть"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def full(self, now: float = None) -> bool:
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        return self.tokens >= self.capacity
@@ -0,0 +1,123 @@
+import os
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery
+
+from bot.utils.delivery import DeliveryQueue
+from bot.utils.metrics import counter
+from bot.utils.ratelimit import PRUNE_INTERVAL, PRUNE_SIZE, TokenBucket
+
+# Лимиты на пользователя, проверяются обработчиками
+MAX_REMINDERS = int(os.getenv("MAX_REMINDERS", "100"))
+MAX_URGENT = int(os.getenv("MAX_URGENT", "10"))
+
+# Готовые ответы: на флуд не тратим ничего, кроме одного вызова Bot API
+THROTTLED_TEXT = "⏳ Слишком много запросов, подождите немного"
+TOO_MANY_REMINDERS_TEXT = f"❌ Можно создать не больше {MAX_REMINDERS} напоминаний. Удалите лишние через /check"
+TOO_MANY_URGENT_TEXT = f"Срочных напоминаний может быть не больше {MAX_URGENT}"
+
+throttled = counter("throttled_total", "Отброшенные обновления", ("kind",))
+
+
+class Throttling(BaseMiddleware):
+    """Внешний middleware для сообщений и нажатий кнопок.
+
+    У каждого пользователя свое ведро токенов на сообщения и на нажатия;
+    обновления сверх него отбрасываются до фильтров и обработчиков, а
+    пользователь получает предупреждение не чаще раза в ``warn_interval``
+    секунд. Повторное нажатие той же кнопки, пока первое обрабатывается или
+    в течение ``duplicate_window`` секунд после, отбрасывается молча (с пустым
+    ответом на нажатие): его результат уже дало первое нажатие.
+    """
+
+    def __init__(
+        self,
+        delivery: DeliveryQueue,
+        message_rate: float = 1,
+        message_burst: float = 5,
+        callback_rate: float = 2,
+        callback_burst: float = 6,
+        duplicate_window: float = 1.0,
+        warn_interval: float = 10.0,
+    ):
+        self.delivery = delivery
+        self.message_rate = message_rate
+        self.message_burst = message_burst
+        self.callback_rate = callback_rate
+        self.callback_burst = callback_burst
+        self.duplicate_window = duplicate_window
+        self.warn_interval = warn_interval
+        self._messages: dict[int, TokenBucket] = {}
+        self._callbacks: dict[int, TokenBucket] = {}
+        self._inflight: set[tuple[int, str]] = set()
+        self._recent: dict[tuple[int, str], float] = {}
+        self._warned: dict[int, float] = {}
+        self._pruned: dict[str, float] = {}
+
+    def _should_prune(self, name: str, items: dict, now: float) -> bool:
+        if len(items) <= PRUNE_SIZE or now - self._pruned.get(name, float("-inf")) < PRUNE_INTERVAL:
+            return False
+        self._pruned[name] = now
+        return True
+
+    def _bucket(
+        self, name: str, buckets: dict[int, TokenBucket], user_id: int, rate: float, burst: float, now: float
+    ) -> TokenBucket:
+        bucket = buckets.get(user_id)
+        if bucket is None:
+            if self._should_prune(name, buckets, now):
+                # Полные ведра ничего не помнят, их можно забыть
+                for key in [key for key, value in buckets.items() if value.full(now)]:
+                    del buckets[key]
+            bucket = buckets[user_id] = TokenBucket(rate, burst, now)
+        return bucket
+
+    def should_warn(self, user_id: int) -> bool:
+        """True, если пользователя пора снова предупредить"""
+        now = time.monotonic()
+        if self._warned.get(user_id, 0) > now:
+            return False
+        if self._should_prune("warned", self._warned, now):
+            self._warned = {key: until for key, until in self._warned.items() if until > now}
+        self._warned[user_id] = now + self.warn_interval
+        return True
+
+    def warn(self, chat_id: int, user_id: int, text: str):
+        """Предупреждение в чат через очередь доставки, не чаще раза в warn_interval"""
+        if self.should_warn(user_id):
+            self.delivery.send_message(chat_id, text)
+
+    async def __call__(self, handler, event, data):
+        user = getattr(event, "from_user", None)
+        if user is None:
+            return await handler(event, data)
+        now = time.monotonic()
+
+        if not isinstance(event, CallbackQuery):
+            if not self._bucket("messages", self._messages, user.id, self.message_rate, self.message_burst, now).take(now):
+                throttled.inc(kind="message")
+                self.warn(event.chat.id, user.id, THROTTLED_TEXT)
+                return None
+            return await handler(event, data)
+
+        key = (user.id, event.data)
+        if key in self._inflight or self._recent.get(key, 0) > now:
+            throttled.inc(kind="duplicate")
+            # Пустой ответ гасит часики на кнопке, иначе они крутятся до таймаута Telegram
+            await event.answer()
+            return None
+        if not self._bucket("callbacks", self._callbacks, user.id, self.callback_rate, self.callback_burst, now).take(now):
+            throttled.inc(kind="callback")
+            await event.answer(THROTTLED_TEXT if self.should_warn(user.id) else None)
+            return None
+
+        self._inflight.add(key)
+        try:
+            return await handler(event, data)
+        finally:
+            self._inflight.discard(key)
+            finished = time.monotonic()
+            if self._should_prune("recent", self._recent, finished):
+                self._recent = {item: until for item, until in self._recent.items() if until > finished}
+            self._recent[key] = finished + self.duplicate_window
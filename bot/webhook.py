@@ -0,0 +1,71 @@
+import asyncio
+import os
+import secrets
+from typing import Union
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from bot.logs.logging_config import logger
+
+# Публичный адрес, на который Telegram будет слать обновления, например https://bot.example.com
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+# Telegram допускает 1-100 одновременных соединений на вебхук
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+# Без заданного секрета генерируем новый на каждый запуск: вебхук все равно
+# переустанавливается при старте
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or secrets.token_urlsafe(32)
+
+
+def webhook_path(bot: Bot, several: bool) -> str:
+    """Путь вебхука бота: у единственного - WEBHOOK_PATH, у нескольких - WEBHOOK_PATH/<id бота>"""
+    return f"{WEBHOOK_PATH.rstrip('/')}/{bot.id}" if several else WEBHOOK_PATH
+
+
+def make_app(bots: Union[Bot, list[Bot]], dispatcher: Dispatcher, secret_token: str = WEBHOOK_SECRET) -> web.Application:
+    """Собирает aiohttp-приложение, принимающее обновления Telegram одного или нескольких ботов"""
+    bots = [bots] if isinstance(bots, Bot) else bots
+    app = web.Application()
+    for bot in bots:
+        # Запросы без верного X-Telegram-Bot-Api-Secret-Token отклоняются с 401
+        SimpleRequestHandler(
+            dispatcher=dispatcher,
+            bot=bot,
+            secret_token=secret_token,
+            handle_in_background=True,
+        ).register(app, path=webhook_path(bot, len(bots) > 1))
+    setup_application(app, dispatcher, bots=bots, bot=bots[0])
+    return app
+
+
+async def run_webhook(bots: Union[Bot, list[Bot]], dispatcher: Dispatcher, stop: asyncio.Event = None):
+    """Поднимает сервер вебхука и регистрирует его в Telegram для каждого бота.
+
+    Работает до отмены задачи или до установки ``stop``; запуском
+    и остановкой планировщика по-прежнему управляет ``main``.
+    """
+    if not WEBHOOK_URL:
+        raise RuntimeError("Для режима webhook нужна переменная окружения WEBHOOK_URL")
+
+    bots = [bots] if isinstance(bots, Bot) else bots
+    runner = web.AppRunner(make_app(bots, dispatcher), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+    try:
+        allowed_updates = dispatcher.resolve_used_update_types()
+        for bot in bots:
+            await bot.set_webhook(
+                url=WEBHOOK_URL.rstrip("/") + webhook_path(bot, len(bots) > 1),
+                secret_token=WEBHOOK_SECRET,
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+                allowed_updates=allowed_updates,
+            )
+        logger.info(f"Вебхук слушает {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}, ботов: {len(bots)}")
+        await (stop or asyncio.Event()).wait()
+    finally:
+        await runner.cleanup()